@@ -0,0 +1,65 @@
+"""
+Bus.send against Bus.publish, an event delivered to @on methods and plain callables, and send with the
+receivers measured by Bus.enable_stats.
+
+    make benchmark
+"""
+
+import argparse
+import time
+
+from tomate.pomodoro import Bus, Events, Subscriber, TimerPayload, on
+
+
+class Widget(Subscriber):
+    @on(Events.TIMER_UPDATE)
+    def _on_timer_update(self, payload: TimerPayload) -> None:
+        pass
+
+
+def receiver(_, payload: TimerPayload) -> None:
+    pass
+
+
+def measure(dispatch, events: int) -> float:
+    payload = TimerPayload(time_left=60, duration=60)
+    start = time.perf_counter()
+
+    for _ in range(events):
+        dispatch(Events.TIMER_UPDATE, payload=payload)
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--receivers", type=int, default=10)
+    args = parser.parse_args()
+
+    bus = Bus()
+    widgets = [Widget() for _ in range(args.receivers // 2)]
+    for widget in widgets:
+        widget.connect(bus)
+    for _ in range(args.receivers - len(widgets)):
+        bus.connect(Events.TIMER_UPDATE, lambda *a, **k: receiver(*a, **k), weak=False)
+
+    send = measure(bus.send, args.events)
+    publish = measure(bus.publish, args.events)
+    bus.enable_stats()
+    measured = measure(bus.send, args.events)
+
+    print(
+        "events={} receivers={} send={:.2f}us publish={:.2f}us speedup={:.2f}x measured={:.2f}us".format(
+            args.events,
+            args.receivers,
+            send / args.events * 1e6,
+            publish / args.events * 1e6,
+            send / publish,
+            measured / args.events * 1e6,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
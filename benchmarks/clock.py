@@ -0,0 +1,75 @@
+"""
+How late the GLib and asyncio clocks run their callbacks, side by side.
+
+    make benchmark
+"""
+
+import argparse
+import asyncio
+
+from gi.repository import GLib
+
+from tomate.pomodoro import AsyncioClock, GLibClock
+
+
+def measure(clock, run, callbacks: int, interval: float) -> list:
+    lateness = []
+
+    def schedule() -> None:
+        due = clock.monotonic() + interval
+
+        def callback() -> bool:
+            lateness.append(clock.monotonic() - due)
+            if len(lateness) < callbacks:
+                schedule()
+            return False
+
+        clock.timeout_add(interval, callback)
+
+    schedule()
+    run(lambda: len(lateness) >= callbacks)
+    return sorted(lateness)
+
+
+def run_glib(done) -> None:
+    loop = GLib.MainLoop()
+    GLib.timeout_add(1, lambda: loop.quit() if done() else True)
+    loop.run()
+
+
+def report(name: str, lateness: list) -> None:
+    print(
+        "backend={} callbacks={} p50={:.3f}ms p99={:.3f}ms max={:.3f}ms".format(
+            name,
+            len(lateness),
+            lateness[len(lateness) // 2] * 1e3,
+            lateness[int(len(lateness) * 0.99)] * 1e3,
+            lateness[-1] * 1e3,
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callbacks", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    report("glib", measure(GLibClock(), run_glib, args.callbacks, args.interval))
+
+    async def wait(done) -> None:
+        while not done():
+            await asyncio.sleep(args.interval)
+
+    loop = asyncio.new_event_loop()
+    try:
+        lateness = measure(
+            AsyncioClock(loop), lambda done: loop.run_until_complete(wait(done)), args.callbacks, args.interval
+        )
+        report("asyncio", lateness)
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Cost of the config reads made on the hot path, Session.duration and the long break interval, with the read
+cache and when the cache is forgotten before every read, like each read used to parse the option again.
+
+    make benchmark
+"""
+
+import argparse
+import time
+from configparser import RawConfigParser
+
+from tomate.pomodoro import Bus, Config
+
+READS = [
+    (Config.DURATION_SECTION, Config.DURATION_POMODORO),
+    (Config.DURATION_SECTION, Config.DURATION_SHORT_BREAK),
+    (Config.DURATION_SECTION, "long_break_interval"),
+]
+
+
+def measure(config: Config, reads: int, forget: bool) -> float:
+    start = time.perf_counter()
+
+    for _ in range(reads // len(READS)):
+        for section, option in READS:
+            if forget:
+                config._forget()
+            config.get_int(section, option)
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=300_000)
+    args = parser.parse_args()
+
+    config = Config(Bus(), RawConfigParser(defaults=Config.DEFAULTS, strict=True))
+
+    cached = measure(config, args.reads, forget=False)
+    parsed = measure(config, args.reads, forget=True)
+
+    print(
+        "reads={} cached={:.3f}us parsed={:.3f}us speedup={:.1f}x".format(
+            args.reads, cached / args.reads * 1e6, parsed / args.reads * 1e6, parsed / cached
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
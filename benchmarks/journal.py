@@ -0,0 +1,89 @@
+"""
+Records the events of running timers in a journal and replays it into a bus with receivers, as fast as possible.
+A journal recorded with tomate-gtk --journal FILE can be replayed instead, its slowest receivers are listed.
+
+    make benchmark
+    python benchmarks/journal.py --journal FILE
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from tomate.pomodoro import Bus, Events, Granularity, Journal, Scheduler, Subscriber, Timer, VirtualClock, journal, on
+
+
+class Widget(Subscriber):
+    @on(Events.TIMER_UPDATE, granularity=Granularity.TICK)
+    def _on_timer_update(self, **__) -> None:
+        pass
+
+    @on(Events.TIMER_END, Events.SESSION_END)
+    def _on_end(self, **__) -> None:
+        pass
+
+
+def record(path: str, timers: int, seconds: float, resolution: float) -> float:
+    clock = VirtualClock()
+    bus = Bus()
+    recorder = Journal(path, clock)
+    recorder.attach(bus)
+
+    for _ in range(timers):
+        timer = Timer(bus, Scheduler(clock))
+        timer.set_resolution(resolution)
+        timer.start(seconds)
+
+    start = time.perf_counter()
+    clock.run()
+    recorder.close()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--journal", help="replays this journal instead of recording one")
+    parser.add_argument("--timers", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=25 * 60)
+    parser.add_argument("--resolution", type=float, default=0.1)
+    parser.add_argument("--receivers", type=int, default=10)
+    args = parser.parse_args()
+
+    path = args.journal
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "events.journal")
+        recorded = record(path, args.timers, args.seconds, args.resolution)
+
+    start = time.perf_counter()
+    records = list(journal.read(path))
+    read = time.perf_counter() - start
+
+    bus = Bus()
+    widgets = [Widget() for _ in range(args.receivers)]
+    for widget in widgets:
+        widget.connect(bus)
+    bus.enable_stats()
+
+    start = time.perf_counter()
+    journal.replay(records, bus)
+    replayed = time.perf_counter() - start
+
+    print(
+        "records={} bytes/record={:.1f} read={:.2f}us/record replay={:.2f}us/record".format(
+            len(records),
+            os.path.getsize(path) / max(len(records), 1),
+            read / max(len(records), 1) * 1e6,
+            replayed / max(len(records), 1) * 1e6,
+        )
+    )
+
+    if args.journal is None:
+        print("record={:.2f}us/record".format(recorded / max(len(records), 1) * 1e6))
+        os.remove(path)
+    else:
+        print(bus.stats_report())
+
+
+if __name__ == "__main__":
+    main()
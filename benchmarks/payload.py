@@ -0,0 +1,76 @@
+"""
+Memory blocks allocated per timer tick and per session event by the payloads, with receivers reading the
+derived values of every payload. The receivers keep what they read, so every allocation stays countable.
+
+    make benchmark
+"""
+
+import argparse
+import tracemalloc
+
+from tomate.pomodoro import Bus, Config, Events, Scheduler, Session, Subscriber, Timer, VirtualClock, on
+
+
+class Widget(Subscriber):
+    def __init__(self, reads: int):
+        self.reads = reads
+        self.seen = []
+
+    @on(Events.TIMER_UPDATE)
+    def _on_timer_update(self, payload) -> None:
+        for _ in range(self.reads):
+            self.seen.append((payload.countdown, payload.remaining_ratio, payload.elapsed_percent))
+
+    @on(Events.SESSION_START, Events.SESSION_INTERRUPT)
+    def _on_session(self, payload) -> None:
+        for _ in range(self.reads):
+            self.seen.append((payload.id, payload.countdown))
+
+
+def blocks(run) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--receivers", type=int, default=5)
+    parser.add_argument("--reads", type=int, default=2)
+    args = parser.parse_args()
+
+    clock = VirtualClock()
+    bus = Bus()
+    config = Config(bus)
+    timer = Timer(bus, Scheduler(clock))
+    session = Session(bus, config, timer)
+    session.ready()
+    widgets = [Widget(args.reads) for _ in range(args.receivers)]
+    for widget in widgets:
+        widget.connect(bus)
+
+    timer.start(args.ticks + 10)
+    per_tick = blocks(lambda: clock.advance(args.ticks)) / args.ticks
+    timer.stop()
+
+    def sessions():
+        for _ in range(args.sessions):
+            session.start()
+            session.stop()
+
+    per_session = blocks(sessions) / args.sessions
+
+    print(
+        "receivers={} reads={} blocks/tick={:.1f} blocks/session={:.1f}".format(
+            args.receivers, args.reads, per_tick, per_session
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Memory taken by each session of a SessionRegistry, measured with tracemalloc.
+
+    make benchmark
+"""
+
+import argparse
+import tempfile
+import tracemalloc
+from unittest import mock
+
+from tomate.pomodoro import Bus, Config, SessionRegistry, VirtualClock
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".conf") as config_file:
+        with mock.patch.object(Config, "config_path", return_value=config_file.name):
+            bus = Bus()
+            clock = VirtualClock()
+            registry = SessionRegistry(bus, Config(bus), clock)
+
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+
+            for key in range(args.sessions):
+                registry.create(key).session.start()
+
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(
+        "sessions={} total={:.1f}KiB per_session={:.0f}B".format(
+            len(registry), size / 1024, size / max(len(registry), 1)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
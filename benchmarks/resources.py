@@ -0,0 +1,68 @@
+"""
+Cost of the icon and resource lookups of the window, the about dialog and the plugin rows, answered by the
+resource index and resolved again in the XDG directories like every lookup used to.
+
+    make benchmark
+"""
+
+import argparse
+import tempfile
+import time
+from configparser import RawConfigParser
+
+from xdg import BaseDirectory
+
+from tomate.pomodoro import Bus, Config
+
+LOOKUPS = [
+    lambda config: config.icon_path("tomate", 22),
+    lambda config: config.icon_path("tomate", 48),
+    lambda config: config.icon_path("tomate", 16),
+    lambda config: config.plugin_paths(),
+    lambda config: config.config_path(),
+]
+
+
+class Unindexed:
+    def lookup(self, key, resolve):
+        return resolve()[0]
+
+
+def measure(config: Config, lookups: int, indexed: bool) -> float:
+    if not indexed:
+        config._index = Unindexed()
+    start = time.perf_counter()
+
+    for _ in range(lookups // len(LOOKUPS)):
+        for lookup in LOOKUPS:
+            if not indexed:
+                config._config_path = None
+            try:
+                lookup(config)
+            except EnvironmentError:
+                pass
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache:
+        BaseDirectory.xdg_cache_home = cache
+        config = Config(Bus(), RawConfigParser(defaults=Config.DEFAULTS, strict=True))
+
+        indexed = measure(config, args.lookups, indexed=True)
+        resolved = measure(config, args.lookups, indexed=False)
+
+    print(
+        "lookups={} indexed={:.3f}us resolved={:.3f}us speedup={:.1f}x".format(
+            args.lookups, indexed / args.lookups * 1e6, resolved / args.lookups * 1e6, resolved / indexed
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Time to connect and disconnect 1,000 subscribers, with the class handler table and with a dir() scan.
+
+    make benchmark
+"""
+
+import argparse
+import time
+
+from tomate.pomodoro import Bus, Events, Subscriber, on
+
+
+class Widget(Subscriber):
+    @property
+    def label(self) -> str:
+        return "label"
+
+    @on(Events.SESSION_START, Events.SESSION_INTERRUPT, Events.SESSION_END)
+    def _on_session(self, **__) -> None:
+        pass
+
+    @on(Events.TIMER_UPDATE)
+    def _on_timer_update(self, **__) -> None:
+        pass
+
+    @on(Events.WINDOW_SHOW, Events.WINDOW_HIDE)
+    def _on_window(self, **__) -> None:
+        pass
+
+    def update(self) -> None:
+        pass
+
+
+def scan(subscriber: Subscriber) -> list:
+    # what Subscriber did before the handler table, one dir() and up to three getattr per attribute
+    return [
+        (getattr(subscriber, attr), getattr(getattr(subscriber, attr), "_events"))
+        for attr in dir(subscriber)
+        if hasattr(getattr(subscriber, attr), "_events")
+    ]
+
+
+def measure(subscribers: list, connect, disconnect) -> float:
+    bus = Bus()
+    start = time.perf_counter()
+
+    for subscriber in subscribers:
+        connect(subscriber, bus)
+    for subscriber in subscribers:
+        disconnect(subscriber, bus)
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1_000)
+    args = parser.parse_args()
+
+    subscribers = [Widget() for _ in range(args.subscribers)]
+
+    def scan_connect(subscriber: Subscriber, bus: Bus) -> None:
+        for method, events in scan(subscriber):
+            for event in events:
+                bus.connect(event, method)
+
+    def scan_disconnect(subscriber: Subscriber, bus: Bus) -> None:
+        for method, events in scan(subscriber):
+            for event in events:
+                bus.disconnect(event, method)
+
+    table = measure(subscribers, Subscriber.connect, Subscriber.disconnect)
+    dir_scan = measure(subscribers, scan_connect, scan_disconnect)
+
+    print(
+        "subscribers={} table={:.1f}ms dir_scan={:.1f}ms speedup={:.1f}x".format(
+            len(subscribers), table * 1e3, dir_scan * 1e3, dir_scan / table
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
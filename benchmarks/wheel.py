@@ -0,0 +1,51 @@
+"""
+Per tick cost of a WheelScheduler driving thousands of timers from one clock source.
+
+    make benchmark
+"""
+import argparse
+import statistics
+import time
+
+from tomate.pomodoro import Bus, Timer, VirtualClock, WheelScheduler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timers", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--resolution", type=float, default=WheelScheduler.RESOLUTION)
+    args = parser.parse_args()
+
+    clock = VirtualClock()
+    wheel = WheelScheduler(clock, resolution=args.resolution)
+    bus = Bus()
+    timers = [Timer(bus, wheel) for _ in range(args.timers)]
+
+    for index, timer in enumerate(timers):
+        # spreads the deadlines, and so the ticks, over the whole second
+        clock.stall(args.resolution * (index % round(1 / args.resolution)) / args.timers)
+        timer.start(25 * 60)
+
+    costs = []
+    for _ in range(round(args.seconds / args.resolution)):
+        start = time.perf_counter()
+        clock.advance(args.resolution)
+        costs.append(time.perf_counter() - start)
+
+    costs.sort()
+    print(
+        "timers={} ticks={} live={} mean={:.1f}us p50={:.1f}us p99={:.1f}us max={:.1f}us".format(
+            args.timers,
+            len(costs),
+            wheel.live(),
+            statistics.mean(costs) * 1e6,
+            costs[len(costs) // 2] * 1e6,
+            costs[int(len(costs) * 0.99)] * 1e6,
+            costs[-1] * 1e6,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
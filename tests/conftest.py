@@ -4,7 +4,7 @@ import pytest
 from gi.repository import Gtk
 from wiring import Graph
 
-from tomate.pomodoro import Bus, Config, PluginEngine, Session
+from tomate.pomodoro import Bus, Config, PluginEngine, Scheduler, Session, VirtualClock
 from tomate.ui import ShortcutEngine, Window
 
 TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
@@ -15,11 +15,28 @@ def session(mocker):
     return mocker.Mock(spec=Session)
 
 
+@pytest.fixture(autouse=True)
+def cache_home(tmpdir, monkeypatch):
+    # the resource index of the tests stays out of the user cache
+    monkeypatch.setattr("xdg.BaseDirectory.xdg_cache_home", tmpdir.join("cache").strpath)
+    return tmpdir.join("cache")
+
+
 @pytest.fixture
 def bus() -> Bus:
     return Bus()
 
 
+@pytest.fixture
+def clock() -> VirtualClock:
+    return VirtualClock()
+
+
+@pytest.fixture
+def scheduler(clock: VirtualClock) -> Scheduler:
+    return Scheduler(clock)
+
+
 @pytest.fixture
 def graph() -> Graph:
     g = Graph()
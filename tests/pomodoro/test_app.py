@@ -4,16 +4,23 @@ from dbus.mainloop.glib import DBusGMainLoop
 from dbusmock import DBusTestCase
 from wiring.scanning import scan_to_graph
 
-from tomate.pomodoro import Application
+from tomate.pomodoro import Application, Executor
 from tomate.pomodoro.app import State
 
 DBusGMainLoop(set_as_default=True)
 
 
 @pytest.fixture
-def app(graph, window, plugin_engine, mocker) -> Application:
+def executor(mocker):
+    return mocker.Mock(spec=Executor)
+
+
+@pytest.fixture
+def app(graph, window, plugin_engine, executor, config, mocker) -> Application:
     graph.register_instance("tomate.ui.view", window)
     graph.register_instance("tomate.plugin", plugin_engine)
+    graph.register_instance("tomate.executor", executor)
+    graph.register_instance("tomate.config", config)
     graph.register_instance("dbus.session", mocker.Mock())
 
     scan_to_graph(["tomate.pomodoro.app"], graph)
@@ -40,6 +47,31 @@ class TestRun:
 
         window.run.assert_called_once_with()
 
+    def test_shuts_the_executor_down_when_the_window_loop_returns(self, app, executor):
+        app.state = State.STOPPED
+
+        app.Run()
+
+        executor.shutdown.assert_called_once_with(wait=False)
+
+    def test_writes_the_pending_config_changes_when_the_window_loop_returns(self, app, config, mocker):
+        flush = mocker.spy(config, "flush")
+        app.state = State.STOPPED
+
+        app.Run()
+
+        flush.assert_called_once_with()
+
+    def test_watches_the_config_file_while_the_window_loop_runs(self, app, config, mocker):
+        watch = mocker.patch.object(config, "watch")
+        unwatch = mocker.patch.object(config, "unwatch")
+        app.state = State.STOPPED
+
+        app.Run()
+
+        watch.assert_called_once_with()
+        unwatch.assert_called_once_with()
+
     def test_shows_window_when_app_is_running(self, app, window):
         app.state = State.STARTED
 
@@ -55,9 +87,13 @@ class TestFromGraph:
     def teardown_method(self):
         DBusTestCase.tearDownClass()
 
-    def test_create_app_instance_when_it_is_not_registered_in_dbus(self, graph, window, plugin_engine):
+    def test_create_app_instance_when_it_is_not_registered_in_dbus(
+        self, graph, window, plugin_engine, executor, config
+    ):
         graph.register_instance("tomate.ui.view", window)
         graph.register_instance("tomate.plugin", plugin_engine)
+        graph.register_instance("tomate.executor", executor)
+        graph.register_instance("tomate.config", config)
         scan_to_graph(["tomate.pomodoro.app"], graph)
 
         instance = Application.from_graph(graph, DBusTestCase.get_dbus())
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from gi.repository import GLib
+from wiring.scanning import scan_to_graph
+
+from tomate.pomodoro import AsyncioClock, GLibClock, VirtualClock
+
+
+def test_module(graph):
+    scan_to_graph(["tomate.pomodoro.clock"], graph)
+
+    instance = graph.get("tomate.clock")
+
+    assert isinstance(instance, GLibClock)
+    assert graph.get("tomate.clock") is instance
+
+
+def test_module_inside_an_event_loop(graph):
+    scan_to_graph(["tomate.pomodoro.clock"], graph)
+
+    async def build():
+        return graph.get("tomate.clock")
+
+    assert isinstance(asyncio.run(build()), AsyncioClock)
+
+
+def run_virtual(_):
+    clock = VirtualClock()
+    return clock, clock.advance
+
+
+def run_glib(_):
+    def run(seconds):
+        loop = GLib.MainLoop()
+        GLib.timeout_add(round(seconds * 1000), loop.quit)
+        loop.run()
+
+    return GLibClock(), run
+
+
+def run_asyncio(request):
+    loop = asyncio.new_event_loop()
+    request.addfinalizer(loop.close)
+    return AsyncioClock(loop), lambda seconds: loop.run_until_complete(asyncio.sleep(seconds))
+
+
+@pytest.fixture(params=[run_virtual, run_glib, run_asyncio], ids=["virtual", "glib", "asyncio"])
+def backend(request):
+    return request.param(request)
+
+
+class TestClockConformance:
+    def test_runs_callbacks_in_due_order(self, backend, mocker):
+        clock, run = backend
+        calls = mocker.Mock(return_value=False)
+        clock.timeout_add(0.02, lambda: calls("second"))
+        clock.timeout_add(0.01, lambda: calls("first"))
+
+        run(0.1)
+
+        assert calls.call_args_list == [mocker.call("first"), mocker.call("second")]
+
+    def test_repeats_callback_while_it_returns_true(self, backend, mocker):
+        clock, run = backend
+        callback = mocker.Mock(side_effect=[True, True, False])
+        clock.timeout_add(0.01, callback)
+
+        run(0.1)
+
+        assert callback.call_count == 3
+
+    def test_does_not_run_removed_source(self, backend, mocker):
+        clock, run = backend
+        callback = mocker.Mock(return_value=False)
+        source = clock.timeout_add(0.01, callback)
+
+        clock.source_remove(source)
+        run(0.05)
+
+        callback.assert_not_called()
+
+    def test_callback_can_remove_its_own_source(self, backend, mocker):
+        clock, run = backend
+        sources = []
+        callback = mocker.Mock(side_effect=lambda: clock.source_remove(sources[0]) or True)
+        sources.append(clock.timeout_add(0.01, callback))
+
+        run(0.1)
+
+        callback.assert_called_once_with()
+
+    def test_monotonic_time_moves_with_the_loop(self, backend):
+        clock, run = backend
+        start = clock.monotonic()
+
+        run(0.05)
+
+        assert clock.monotonic() - start >= 0.05 - 0.001
+
+
+class TestVirtualClock:
+    def test_runs_callbacks_in_due_order(self, mocker):
+        clock = VirtualClock()
+        calls = mocker.Mock(return_value=False)
+        clock.timeout_add(2, lambda: calls("second"))
+        clock.timeout_add(1, lambda: calls("first"))
+
+        assert clock.advance(5) == 2
+        assert calls.call_args_list == [mocker.call("first"), mocker.call("second")]
+        assert clock.monotonic() == 5
+
+    def test_repeats_callback_while_it_returns_true(self, mocker):
+        clock = VirtualClock()
+        callback = mocker.Mock(side_effect=[True, True, False])
+        clock.timeout_add(1, callback)
+
+        clock.advance(10)
+
+        assert callback.call_count == 3
+        assert clock.pending() == 0
+
+    def test_does_not_run_removed_source(self, mocker):
+        clock = VirtualClock()
+        callback = mocker.Mock()
+        source = clock.timeout_add(1, callback)
+
+        clock.source_remove(source)
+        clock.advance(1)
+
+        callback.assert_not_called()
+
+    def test_stall_moves_time_without_running_callbacks(self, mocker):
+        clock = VirtualClock()
+        callback = mocker.Mock(return_value=False)
+        clock.timeout_add(1, callback)
+
+        clock.stall(10)
+
+        callback.assert_not_called()
+        assert clock.monotonic() == 10
+
+    def test_runs_until_there_is_no_source_left(self, mocker):
+        clock = VirtualClock()
+        callback = mocker.Mock(side_effect=[True, False])
+        clock.timeout_add(30, callback)
+
+        assert clock.run() == 2
+        assert clock.monotonic() == 60
+
+    def test_suspend_moves_only_the_boot_time(self):
+        clock = VirtualClock()
+
+        clock.suspend(10)
+
+        assert clock.monotonic() == 0
+        assert clock.boottime() == 10
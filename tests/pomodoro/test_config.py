@@ -1,15 +1,19 @@
 import os
+from configparser import RawConfigParser
 
 import pytest
+from gi.repository import Gio
 from wiring.scanning import scan_to_graph
+from xdg import IconTheme
 
 from tests.conftest import TEST_DATA_DIR
-from tomate.pomodoro import Config, ConfigPayload, Events
+from tomate.pomodoro import Config, ConfigPayload, Events, Scheduler, Session, Timer
 
 
 @pytest.fixture
-def config(graph, bus):
+def config(graph, bus, clock):
     graph.register_instance("tomate.bus", bus)
+    graph.register_instance("tomate.clock", clock)
     scan_to_graph(["tomate.pomodoro.config"], graph)
     return graph.get("tomate.config")
 
@@ -56,6 +60,45 @@ def test_get_icon_path(config):
     assert config.icon_path("tomate", 48, "hicolor") == expected
 
 
+class TestResourceIndex:
+    def test_looks_icons_up_once(self, config, mocker):
+        get_icon_path = mocker.spy(IconTheme, "getIconPath")
+
+        first = config.icon_path("tomate", 48, "hicolor")
+        second = config.icon_path("tomate", 48, "hicolor")
+
+        assert first == second
+        get_icon_path.assert_called_once()
+
+    def test_keeps_the_icons_in_the_cache_directory(self, bus, config, cache_home, mocker):
+        expected = config.icon_path("tomate", 48, "hicolor")
+        get_icon_path = mocker.spy(IconTheme, "getIconPath")
+
+        assert cache_home.join("tomate", "resources.json").check()
+        assert Config(bus).icon_path("tomate", 48, "hicolor") == expected
+        get_icon_path.assert_not_called()
+
+    def test_remembers_a_missing_resource(self, config):
+        for _ in range(2):
+            with pytest.raises(OSError):
+                config.media_uri("tomate.jpg")
+
+        assert (config.index().hits, config.index().misses) == (1, 1)
+
+    def test_plugin_paths_keep_the_order_of_the_data_directories(self, config, mocker):
+        mocker.patch.object(config, "_load_data_paths", return_value=["/b/plugins", "/a/plugins", "/b/plugins"])
+        config.index().clear()
+
+        assert config.plugin_paths() == ["/b/plugins", "/a/plugins"]
+
+    def test_config_path_creates_the_directory_once(self, bus, mocker):
+        save_config_path = mocker.patch("tomate.pomodoro.config.BaseDirectory.save_config_path", return_value="/x")
+        config = Config(bus, RawConfigParser())
+
+        assert config.config_path() == config.config_path() == "/x/tomate.conf"
+        save_config_path.assert_called_once_with("tomate")
+
+
 def test_icon_paths(config):
     assert os.path.join(TEST_DATA_DIR, "icons") in config.icon_paths()
 
@@ -106,3 +149,349 @@ def test_remove_option(bus, config, mocker, tmpdir):
 
     payload = ConfigPayload("remove", "section", "option", "")
     subscriber.assert_called_once_with(Events.CONFIG_CHANGE, payload=payload)
+
+
+class TestWriteBehind:
+    @pytest.fixture
+    def config(self, bus, clock):
+        # its own parser, the changes do not leak into the other tests
+        return Config(bus, RawConfigParser(defaults=Config.DEFAULTS, strict=True), clock)
+
+    @pytest.fixture
+    def path(self, config, tmpdir):
+        path = tmpdir.mkdir("tmp").join("tomate.conf")
+        config.config_path = lambda: path.strpath
+        return path
+
+    def test_writes_after_the_save_delay(self, config, clock, path):
+        config.set("Timer", "pomodoro_duration", "20")
+
+        assert config.get_int("Timer", "pomodoro_duration") == 20
+        assert not path.exists()
+
+        clock.advance(Config.SAVE_DELAY)
+
+        assert "pomodoro_duration = 20" in path.read()
+
+    def test_writes_many_changes_once(self, config, clock, path):
+        for minutes in range(20, 30):
+            config.set("Timer", "pomodoro_duration", str(minutes))
+            clock.advance(Config.SAVE_DELAY / 2)
+
+        assert config.write_stats() == (10, 0, 9, True)
+
+        clock.advance(Config.SAVE_DELAY)
+
+        assert "pomodoro_duration = 29" in path.read()
+        assert config.write_stats() == (10, 1, 9, False)
+
+    def test_flush_writes_the_pending_changes(self, config, clock, path):
+        config.set("Timer", "pomodoro_duration", "20")
+        config.remove("Timer", "pomodoro_duration")
+
+        config.flush()
+
+        assert "pomodoro_duration = 20" not in path.read()
+        assert clock.pending() == 0
+        assert config.write_stats().written == 1
+
+    def test_replaces_the_file_atomically(self, config, path):
+        path.write("[timer]\n")
+        path.chmod(0o640)
+
+        config.set("Timer", "pomodoro_duration", "20")
+        config.flush()
+
+        assert path.dirpath().listdir() == [path]
+        assert path.stat().mode & 0o777 == 0o640
+
+    def test_writes_at_once_without_a_clock(self, bus, tmpdir):
+        path = tmpdir.join("tomate.conf")
+        config = Config(bus, RawConfigParser(defaults=Config.DEFAULTS, strict=True))
+        config.config_path = lambda: path.strpath
+
+        config.set("Timer", "pomodoro_duration", "20")
+
+        assert "pomodoro_duration = 20" in path.read()
+        assert config.write_stats() == (1, 1, 0, False)
+
+
+class TestReadCache:
+    @pytest.fixture
+    def config(self, bus):
+        return Config(bus, RawConfigParser(defaults=Config.DEFAULTS, strict=True))
+
+    @pytest.fixture(autouse=True)
+    def path(self, config, tmpdir):
+        path = tmpdir.join("tomate.conf")
+        config.config_path = lambda: path.strpath
+        return path
+
+    def test_reads_the_parser_once(self, config, mocker):
+        getint = mocker.spy(config.parser, "getint")
+
+        assert config.get_int("Timer", "pomodoro_duration") == 25
+        assert config.get_int("Timer", "pomodoro_duration") == 25
+
+        getint.assert_called_once()
+
+    def test_caches_each_type_apart(self, config):
+        assert config.get("Timer", "pomodoro_duration") == "25"
+        assert config.get_int("Timer", "pomodoro_duration") == 25
+
+    def test_reading_does_not_add_the_section(self, config):
+        assert config.get_int("Sounds", "pomodoro_duration") == 25
+        assert config.get("Sounds", "missing", fallback="fallback") == "fallback"
+
+        assert config.parser.has_section("sounds") is False
+
+    def test_set_forgets_the_option(self, config):
+        config.get_int("Timer", "pomodoro_duration")
+        config.get_int("Timer", "shortbreak_duration")
+
+        config.set("timer", "Pomodoro Duration", "20")
+
+        assert config.get_int("Timer", "pomodoro_duration") == 20
+        assert config.get_int("Timer", "shortbreak_duration") == 5
+
+    def test_remove_forgets_the_option(self, config):
+        config.set("Timer", "pomodoro_duration", "20")
+        assert config.get_int("Timer", "pomodoro_duration") == 20
+
+        config.remove("Timer", "pomodoro_duration")
+
+        assert config.get_int("Timer", "pomodoro_duration") == 25
+
+    def test_load_forgets_everything(self, config, path):
+        assert config.get_int("Timer", "pomodoro_duration") == 25
+        path.write("[timer]\npomodoro_duration = 30\n")
+
+        config.load()
+
+        assert config.get_int("Timer", "pomodoro_duration") == 30
+
+    def test_fallback_is_not_cached(self, config):
+        assert config.get("Timer", "missing", fallback="first") == "first"
+        assert config.get("Timer", "missing", fallback="second") == "second"
+
+
+class TestTransaction:
+    @pytest.fixture
+    def config(self, bus, clock, tmpdir):
+        config = Config(bus, RawConfigParser(defaults=Config.DEFAULTS, strict=True), clock)
+        path = tmpdir.join("tomate.conf")
+        config.config_path = lambda: path.strpath
+        return config
+
+    @pytest.fixture
+    def subscriber(self, bus, mocker):
+        subscriber = mocker.Mock()
+        bus.connect(Events.CONFIG_CHANGE, subscriber, weak=False)
+        return subscriber
+
+    def test_sends_one_change_with_every_option(self, config, subscriber):
+        with config.transaction():
+            config.set("Timer", "pomodoro_duration", "20")
+            config.set("Timer", "shortbreak_duration", "4")
+            config.remove("Timer", "longbreak_duration")
+            subscriber.assert_not_called()
+
+        subscriber.assert_called_once_with(
+            Events.CONFIG_CHANGE,
+            payload=ConfigPayload(
+                "batch",
+                "timer",
+                "",
+                "",
+                changes=(
+                    ConfigPayload("set", "timer", "pomodoro_duration", "20"),
+                    ConfigPayload("set", "timer", "shortbreak_duration", "4"),
+                    ConfigPayload("remove", "timer", "longbreak_duration", ""),
+                ),
+            ),
+        )
+
+    def test_writes_the_file_once(self, config, clock):
+        with config.transaction():
+            config.set("Timer", "pomodoro_duration", "20")
+            config.set("Timer", "shortbreak_duration", "4")
+
+        clock.advance(Config.SAVE_DELAY)
+
+        assert config.write_stats() == (2, 1, 1, False)
+
+    def test_keeps_the_last_change_of_an_option(self, config, subscriber):
+        with config.transaction():
+            config.set("Timer", "pomodoro_duration", "20")
+            config.set("Timer", "pomodoro_duration", "21")
+
+        subscriber.assert_called_once_with(
+            Events.CONFIG_CHANGE, payload=ConfigPayload("set", "timer", "pomodoro_duration", "21")
+        )
+
+    def test_sends_one_change_per_section(self, config, subscriber):
+        with config.transaction():
+            config.set("Timer", "pomodoro_duration", "20")
+            config.set("Shortcuts", "start", "<control>s")
+            config.set("Timer", "shortbreak_duration", "4")
+
+        sections = [(c.kwargs["payload"].section, len(c.kwargs["payload"].changes)) for c in subscriber.call_args_list]
+        assert sections == [("timer", 2), ("shortcuts", 0)]
+
+    def test_nested_transactions_commit_with_the_outer_one(self, config, subscriber):
+        with config.transaction():
+            with config.transaction():
+                config.set("Timer", "pomodoro_duration", "20")
+            config.set("Timer", "shortbreak_duration", "4")
+            subscriber.assert_not_called()
+
+        subscriber.assert_called_once()
+
+    def test_error_undoes_the_changes(self, config, clock, subscriber):
+        config.set("Timer", "pomodoro_duration", "20")
+        subscriber.reset_mock()
+
+        with pytest.raises(RuntimeError):
+            with config.transaction():
+                config.set("Timer", "pomodoro_duration", "30")
+                config.set("Sounds", "volume", "10")
+                raise RuntimeError()
+
+        subscriber.assert_not_called()
+        assert config.get_int("Timer", "pomodoro_duration") == 20
+        assert config.parser.has_section("sounds") is False
+        assert config.get_int("Timer", "shortbreak_duration") == 5
+        assert config.write_stats().requested == 1
+
+    def test_session_changes_once(self, bus, config, clock):
+        session = Session(bus, config, Timer(bus, Scheduler(clock)))
+        session.ready()
+        changes = []
+        bus.connect(Events.SESSION_CHANGE, lambda *_, payload: changes.append(payload.duration), weak=False)
+
+        with config.transaction():
+            for option in (Config.DURATION_POMODORO, Config.DURATION_SHORT_BREAK, Config.DURATION_LONG_BREAK):
+                config.set(Config.DURATION_SECTION, option, "10")
+
+        assert changes == [10 * 60]
+
+
+class TestReload:
+    @pytest.fixture
+    def path(self, tmpdir):
+        path = tmpdir.join("tomate.conf")
+        path.write("[timer]\npomodoro_duration = 20\nshortbreak_duration = 4\n")
+        return path
+
+    @pytest.fixture
+    def config(self, bus, clock, path, mocker):
+        mocker.patch.object(Config, "config_path", return_value=path.strpath)
+        return Config(bus, RawConfigParser(defaults=Config.DEFAULTS, strict=True), clock)
+
+    @pytest.fixture
+    def subscriber(self, bus, mocker):
+        subscriber = mocker.Mock()
+        bus.connect(Events.CONFIG_CHANGE, subscriber, weak=False)
+        return subscriber
+
+    def test_sends_only_the_options_which_changed(self, config, path, subscriber):
+        path.write("[timer]\npomodoro_duration = 30\nshortbreak_duration = 4\n[shortcuts]\nstart = <control>s\n")
+
+        assert config.reload() is True
+
+        payloads = [c.kwargs["payload"] for c in subscriber.call_args_list]
+        assert payloads == [
+            ConfigPayload("set", "timer", "pomodoro_duration", "30"),
+            ConfigPayload("set", "shortcuts", "start", "<control>s"),
+        ]
+        assert config.get_int("Timer", "pomodoro_duration") == 30
+
+    def test_sends_the_removed_options(self, config, path, subscriber):
+        path.write("[timer]\npomodoro_duration = 20\n")
+
+        config.reload()
+
+        subscriber.assert_called_once_with(
+            Events.CONFIG_CHANGE, payload=ConfigPayload("set", "timer", "shortbreak_duration", "5")
+        )
+        assert config.get_int("Timer", "shortbreak_duration") == 5
+
+    def test_sends_the_options_of_a_removed_section(self, config, path, subscriber):
+        config.set("Sounds", "volume", "10")
+        config.flush()
+        subscriber.reset_mock()
+        path.write(path.read().replace("[sounds]\nvolume = 10\n", ""))
+
+        config.reload()
+
+        payloads = [c.kwargs["payload"].option for c in subscriber.call_args_list]
+        assert "volume" in payloads
+        assert config.parser.has_section("sounds") is False
+
+    def test_ignores_the_same_content(self, config, path, subscriber):
+        path.write(path.read())
+
+        assert config.reload() is False
+        subscriber.assert_not_called()
+
+    def test_ignores_its_own_writes(self, config, subscriber):
+        config.set("Timer", "pomodoro_duration", "25")
+        config.flush()
+        subscriber.reset_mock()
+
+        assert config.reload() is False
+        subscriber.assert_not_called()
+
+    def test_keeps_the_changes_waiting_to_be_written(self, config, path, subscriber):
+        config.set("Timer", "pomodoro_duration", "25")
+        path.write("[timer]\npomodoro_duration = 30\n")
+
+        assert config.reload() is False
+        assert config.get_int("Timer", "pomodoro_duration") == 25
+
+    def test_keeps_the_values_when_the_file_is_broken(self, config, path, subscriber):
+        path.write("[timer]\npomodoro_duration = 30\npomodoro_duration = 31\n")
+
+        assert config.reload() is False
+        subscriber.assert_not_called()
+        assert config.get_int("Timer", "pomodoro_duration") == 20
+
+    def test_reads_a_burst_of_changes_once(self, config, clock, path, subscriber, mocker):
+        reload = mocker.spy(config, "reload")
+        path.write("[timer]\npomodoro_duration = 30\n")
+
+        for event in (
+            Gio.FileMonitorEvent.CHANGED,
+            Gio.FileMonitorEvent.CHANGED,
+            Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+        ):
+            config._on_file_changed(None, None, None, event)
+            clock.advance(Config.RELOAD_DELAY / 2)
+
+        reload.assert_not_called()
+        clock.advance(Config.RELOAD_DELAY)
+
+        reload.assert_called_once_with()
+        assert config.get_int("Timer", "pomodoro_duration") == 30
+
+    def test_ignores_other_file_events(self, config, clock, mocker):
+        reload = mocker.spy(config, "reload")
+
+        config._on_file_changed(None, None, None, Gio.FileMonitorEvent.ATTRIBUTE_CHANGED)
+        clock.advance(Config.RELOAD_DELAY)
+
+        reload.assert_not_called()
+
+    def test_watches_the_file(self, config, path, mocker):
+        new_for_path = mocker.patch("tomate.pomodoro.config.Gio.File.new_for_path")
+        monitor = new_for_path.return_value.monitor_file.return_value
+
+        config.watch()
+        config.watch()
+
+        new_for_path.assert_called_once_with(path.strpath)
+        monitor.connect.assert_called_once_with("changed", config._on_file_changed)
+
+        config.unwatch()
+
+        monitor.cancel.assert_called_once_with()
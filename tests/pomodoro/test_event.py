@@ -1,6 +1,25 @@
+import asyncio
+import gc
+import threading
+
+import pytest
 from wiring.scanning import scan_to_graph
 
-from tomate.pomodoro import Bus, Events, Subscriber, on
+from tomate.pomodoro import (
+    AsyncioClock,
+    Bus,
+    ConfigPayload,
+    Events,
+    Granularity,
+    Lane,
+    Policy,
+    ReceiverStats,
+    SessionPayload,
+    SessionType,
+    Subscriber,
+    TimerPayload,
+    on,
+)
 
 
 class TestBus:
@@ -20,6 +39,183 @@ class TestBus:
 
         assert bus.send(Events.SESSION_START, payload="payload") == []
 
+    def test_has_receivers(self, bus, mocker):
+        receiver = mocker.Mock()
+
+        assert bus.has_receivers(Events.SESSION_START) is False
+
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+
+        assert bus.has_receivers(Events.SESSION_START) is True
+        assert bus.has_receivers(Events.SESSION_END) is False
+
+    def test_disconnects_dead_weak_receiver(self, bus):
+        class Subject:
+            def receiver(self, *_, **__):
+                return True
+
+        subject = Subject()
+        bus.connect(Events.SESSION_START, subject.receiver)
+
+        assert bus.send(Events.SESSION_START) == [True]
+
+        del subject
+        gc.collect()
+
+        assert bus.has_receivers(Events.SESSION_START) is False
+        assert bus.send(Events.SESSION_START) == []
+
+    def test_connects_receiver_once(self, bus, mocker):
+        receiver = mocker.Mock(return_value=True)
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+
+        assert bus.send(Events.SESSION_START) == [True]
+
+    def test_publish_calls_receivers_without_collecting_results(self, bus, mocker):
+        receiver = mocker.Mock(return_value=True)
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+
+        assert bus.publish(Events.SESSION_START, payload="payload") is None
+        receiver.assert_called_once_with(Events.SESSION_START, payload="payload")
+
+    def test_publish_follows_connect_and_disconnect(self, bus, mocker):
+        first = mocker.Mock()
+        second = mocker.Mock()
+        bus.connect(Events.SESSION_START, first, weak=False)
+        bus.publish(Events.SESSION_START)
+
+        bus.connect(Events.SESSION_START, second, weak=False)
+        bus.disconnect(Events.SESSION_START, first)
+        bus.publish(Events.SESSION_START)
+
+        assert first.call_count == 1
+        assert second.call_count == 1
+
+    def test_receiver_connected_while_publishing_gets_the_next_event(self, bus, mocker):
+        late = mocker.Mock()
+        early = mocker.Mock(side_effect=lambda *_, **__: bus.connect(Events.SESSION_START, late, weak=False))
+        bus.connect(Events.SESSION_START, early, weak=False)
+
+        bus.publish(Events.SESSION_START)
+        late.assert_not_called()
+
+        bus.publish(Events.SESSION_START)
+        late.assert_called_once_with(Events.SESSION_START, payload=None)
+
+    def test_connects_method_once(self, bus):
+        class Subject:
+            def receiver(self, *_, **__):
+                return True
+
+        subject = Subject()
+        bus.connect(Events.SESSION_START, subject.receiver)
+        bus.connect(Events.SESSION_START, subject.receiver)
+
+        assert bus.is_connect(Events.SESSION_START, subject.receiver) is True
+        assert bus.send(Events.SESSION_START) == [True]
+
+    def test_reconnect_changes_reference_type(self, bus):
+        class Subject:
+            def receiver(self, *_, **__):
+                return True
+
+        subject = Subject()
+        bus.connect(Events.SESSION_START, subject.receiver)
+        bus.connect(Events.SESSION_START, subject.receiver, weak=False)
+
+        del subject
+        gc.collect()
+
+        assert bus.send(Events.SESSION_START) == [True]
+
+
+class TestGranularity:
+    @pytest.mark.parametrize(
+        "granularity,calls",
+        [
+            (None, 121),
+            (Granularity.TICK, 121),
+            (Granularity.SECOND, 121),
+            (Granularity.MINUTE, 3),
+            (Granularity.PERCENT, 21),
+            (Granularity.COUNTDOWN, 121),
+        ],
+    )
+    def test_calls_receiver_when_its_granularity_changes(self, granularity, calls, bus, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, receiver, weak=False, granularity=granularity)
+
+        for time_left in range(120, -1, -1):
+            bus.send(Events.TIMER_UPDATE, payload=TimerPayload(time_left=time_left, duration=120))
+
+        assert receiver.call_count == calls
+
+    def test_subscriber_declares_granularity(self, bus):
+        class Subject(Subscriber):
+            def __init__(self):
+                self.minutes = []
+
+            @on(Events.TIMER_UPDATE, granularity=Granularity.MINUTE)
+            def minute_changed(self, payload):
+                self.minutes.append(payload.time_left // 60)
+
+        subject = Subject()
+        subject.connect(bus)
+
+        for time_left in (150, 130, 120, 119, 60, 59):
+            bus.send(Events.TIMER_UPDATE, payload=TimerPayload(time_left=time_left, duration=150))
+
+        assert subject.minutes == [2, 1, 0]
+
+    def test_subscriber_applies_granularity_only_to_timer_update(self, bus):
+        class Subject(Subscriber):
+            def __init__(self):
+                self.calls = []
+
+            @on(Events.TIMER_UPDATE, Events.SESSION_READY, granularity=Granularity.MINUTE)
+            def changed(self, payload):
+                self.calls.append(payload)
+
+        subject = Subject()
+        subject.connect(bus)
+
+        bus.send(Events.SESSION_READY, payload="session")
+        bus.send(Events.SESSION_READY, payload="session")
+        bus.send(Events.TIMER_UPDATE, payload=TimerPayload(time_left=150, duration=150))
+        bus.send(Events.TIMER_UPDATE, payload=TimerPayload(time_left=130, duration=150))
+
+        assert subject.calls == ["session", "session", TimerPayload(time_left=150, duration=150)]
+
+    def test_rejects_granularity_without_timer_update(self):
+        with pytest.raises(ValueError):
+            on(Events.SESSION_READY, granularity=Granularity.MINUTE)
+
+    def test_sends_only_to_receivers_of_a_granularity(self, bus, mocker):
+        tick = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, tick, weak=False, granularity=Granularity.TICK)
+        second = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, second, weak=False)
+
+        bus.send(
+            Events.TIMER_UPDATE,
+            payload=TimerPayload(time_left=60, duration=60, remaining=59.9),
+            granularity=Granularity.TICK,
+        )
+
+        tick.assert_called_once()
+        second.assert_not_called()
+
+    def test_reset_calls_receiver_with_the_same_key_again(self, bus, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, receiver, weak=False, granularity=Granularity.MINUTE)
+
+        bus.send(Events.TIMER_UPDATE, payload=TimerPayload(time_left=1450, duration=1500))
+        bus.reset(Events.TIMER_UPDATE)
+        bus.send(Events.TIMER_UPDATE, payload=TimerPayload(time_left=1499, duration=1500))
+
+        assert receiver.call_count == 2
+
 
 def test_subscriber(bus):
     class Subject(Subscriber):
@@ -44,7 +240,482 @@ def test_subscriber(bus):
     assert bus.send(Events.SESSION_START) == []
 
 
-def test_module(graph):
+class TestQueue:
+    @pytest.fixture
+    def received(self, bus, mocker):
+        receiver = mocker.Mock(side_effect=lambda event, **__: event)
+        for event in Events:
+            bus.connect(event, receiver, weak=False)
+        return receiver
+
+    def events(self, receiver):
+        return [c.args[0] for c in receiver.call_args_list]
+
+    def test_delivers_published_events_when_idle(self, bus, clock, received):
+        bus.enable_queue(clock)
+
+        bus.publish(Events.SESSION_START)
+        received.assert_not_called()
+
+        clock.advance(0)
+        received.assert_called_once_with(Events.SESSION_START, payload=None)
+
+    def test_send_is_not_queued(self, bus, clock, received):
+        bus.enable_queue(clock)
+
+        assert bus.send(Events.SESSION_START) == [Events.SESSION_START]
+
+    def test_delivers_session_events_first(self, bus, clock, received):
+        bus.enable_queue(clock)
+
+        bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=1, duration=2))
+        bus.publish(Events.CONFIG_CHANGE)
+        bus.publish(Events.TIMER_END)
+        bus.publish(Events.SESSION_END)
+        clock.advance(0)
+
+        assert self.events(received) == [
+            Events.TIMER_END,
+            Events.SESSION_END,
+            Events.CONFIG_CHANGE,
+            Events.TIMER_UPDATE,
+        ]
+
+    def test_keeps_the_order_of_an_event(self, bus, clock, received):
+        bus.enable_queue(clock)
+        bus.set_policy(Events.TIMER_UPDATE, Policy.KEEP_ALL)
+
+        for time_left in (3, 2, 1):
+            bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=time_left, duration=3))
+        clock.advance(0)
+
+        assert [c.kwargs["payload"].time_left for c in received.call_args_list] == [3, 2, 1]
+
+    def test_events_published_while_draining_wait_for_the_next_idle_call(self, bus, clock, mocker):
+        bus.enable_queue(clock)
+        ended = mocker.Mock()
+        bus.connect(Events.SESSION_END, ended, weak=False)
+        bus.connect(Events.TIMER_END, lambda *_, **__: bus.publish(Events.SESSION_END), weak=False)
+
+        bus.publish(Events.TIMER_END)
+        clock.advance(0)
+
+        ended.assert_called_once()
+        assert clock.pending() == 0
+
+    def test_publisher_drains_a_full_queue(self, bus, clock, received):
+        bus.enable_queue(clock, size=2)
+
+        bus.publish(Events.SESSION_START)
+        bus.publish(Events.SESSION_INTERRUPT)
+        bus.publish(Events.SESSION_RESET)
+
+        assert self.events(received) == [Events.SESSION_START, Events.SESSION_INTERRUPT]
+        assert bus.queue_stats().overflows == 1
+
+    def test_queue_stats(self, bus, clock, received):
+        bus.enable_queue(clock)
+
+        bus.publish(Events.SESSION_START)
+        bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=1, duration=2))
+
+        stats = bus.queue_stats()
+        assert stats.depth == {Lane.SESSION: 1, Lane.DEFAULT: 0, Lane.UI: 1}
+        assert stats.queued == 2
+        assert stats.delivered == 0
+
+        clock.advance(0)
+
+        stats = bus.queue_stats()
+        assert stats.depth == {Lane.SESSION: 0, Lane.DEFAULT: 0, Lane.UI: 0}
+        assert stats.high_water == 2
+        assert stats.delivered == 2
+
+    def test_disable_delivers_the_queued_events(self, bus, clock, received):
+        bus.enable_queue(clock)
+        bus.publish(Events.SESSION_START)
+
+        bus.disable_queue()
+
+        received.assert_called_once_with(Events.SESSION_START, payload=None)
+        assert clock.pending() == 0
+
+        bus.publish(Events.SESSION_END)
+        assert received.call_count == 2
+
+    def test_reset_waits_for_the_queued_updates(self, bus, clock, mocker):
+        bus.enable_queue(clock)
+        receiver = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, receiver, weak=False, granularity=Granularity.MINUTE)
+
+        bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=1450, duration=1500))
+        bus.reset(Events.TIMER_UPDATE)
+        bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=1499, duration=1500))
+        clock.advance(0)
+
+        assert receiver.call_count == 2
+
+    def test_delivers_only_the_latest_timer_update(self, bus, clock, received):
+        bus.enable_queue(clock)
+
+        for time_left in (3, 2, 1):
+            bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=time_left, duration=3))
+        clock.advance(0)
+
+        assert [c.kwargs["payload"].time_left for c in received.call_args_list] == [1]
+        assert bus.queue_stats().coalesced == 2
+        assert bus.queue_stats().high_water == 1
+
+    def test_a_tick_does_not_replace_an_update_for_every_receiver(self, bus, clock, mocker):
+        bus.enable_queue(clock)
+        second = mocker.Mock()
+        tick = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, second, weak=False, granularity=Granularity.SECOND)
+        bus.connect(Events.TIMER_UPDATE, tick, weak=False, granularity=Granularity.TICK)
+
+        bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=2, duration=3))
+        bus.publish(
+            Events.TIMER_UPDATE,
+            payload=TimerPayload(time_left=2, duration=3, remaining=1.5),
+            granularity=Granularity.TICK,
+        )
+        bus.publish(
+            Events.TIMER_UPDATE,
+            payload=TimerPayload(time_left=2, duration=3, remaining=1.2),
+            granularity=Granularity.TICK,
+        )
+        clock.advance(0)
+
+        assert [c.kwargs["payload"].remaining for c in second.call_args_list] == [None]
+        assert [c.kwargs["payload"].remaining for c in tick.call_args_list] == [None, 1.2]
+        assert bus.queue_stats().coalesced == 1
+
+    def test_does_not_coalesce_across_a_reset(self, bus, clock, received):
+        bus.enable_queue(clock)
+
+        bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=1, duration=3))
+        bus.reset(Events.TIMER_UPDATE)
+        bus.publish(Events.TIMER_UPDATE, payload=TimerPayload(time_left=3, duration=3))
+        clock.advance(0)
+
+        assert [c.kwargs["payload"].time_left for c in received.call_args_list] == [1, 3]
+
+    def test_never_drops_session_events(self, bus, clock, received):
+        bus.enable_queue(clock)
+
+        for _ in range(3):
+            bus.publish(Events.SESSION_START)
+        clock.advance(0)
+
+        assert received.call_count == 3
+        with pytest.raises(ValueError):
+            bus.set_policy(Events.SESSION_END, Policy.LATEST)
+
+
+class TestFilters:
+    def pomodoro(self, session_type=SessionType.POMODORO):
+        return SessionPayload(type=session_type, pomodoros=0, duration=1500)
+
+    def test_calls_only_the_receivers_the_payload_matches(self, bus, mocker):
+        pomodoro = mocker.Mock(return_value="pomodoro")
+        every = mocker.Mock(return_value="every")
+        bus.connect(Events.SESSION_START, pomodoro, weak=False, where={"type": SessionType.POMODORO})
+        bus.connect(Events.SESSION_START, every, weak=False)
+
+        assert bus.send(Events.SESSION_START, payload=self.pomodoro()) == ["pomodoro", "every"]
+        assert bus.send(Events.SESSION_START, payload=self.pomodoro(SessionType.SHORT_BREAK)) == ["every"]
+        assert pomodoro.call_count == 1
+
+    def test_matches_every_field(self, bus, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.CONFIG_CHANGE, receiver, weak=False, where={"action": "set", "section": "timer"})
+
+        bus.send(Events.CONFIG_CHANGE, payload=ConfigPayload("set", "shortcuts", "start", "<control>s"))
+        bus.send(Events.CONFIG_CHANGE, payload=ConfigPayload("remove", "timer", "pomodoro_duration", ""))
+        receiver.assert_not_called()
+
+        bus.send(Events.CONFIG_CHANGE, payload=ConfigPayload("set", "timer", "pomodoro_duration", "20"))
+        receiver.assert_called_once()
+
+    def test_does_not_match_payloads_without_the_field(self, bus, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.SESSION_START, receiver, weak=False, where={"type": SessionType.POMODORO})
+
+        bus.send(Events.SESSION_START)
+        bus.send(Events.SESSION_START, payload=TimerPayload(time_left=1, duration=2))
+
+        receiver.assert_not_called()
+
+    def test_published_events_are_filtered(self, bus, clock, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.SESSION_END, receiver, weak=False, where={"type": SessionType.LONG_BREAK})
+        bus.enable_queue(clock)
+
+        long_break = self.pomodoro(SessionType.LONG_BREAK)
+        bus.publish(Events.SESSION_END, payload=self.pomodoro())
+        bus.publish(Events.SESSION_END, payload=long_break)
+        clock.advance(0)
+
+        receiver.assert_called_once_with(Events.SESSION_END, payload=long_break)
+
+    def test_connecting_again_changes_the_filter(self, bus, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.SESSION_START, receiver, weak=False, where={"type": SessionType.POMODORO})
+        bus.send(Events.SESSION_START, payload=self.pomodoro(SessionType.SHORT_BREAK))
+
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+        bus.send(Events.SESSION_START, payload=self.pomodoro(SessionType.SHORT_BREAK))
+
+        receiver.assert_called_once()
+
+    def test_unhashable_values(self, bus, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.CONFIG_CHANGE, receiver, weak=False, where={"value": ["a"]})
+
+        bus.send(Events.CONFIG_CHANGE, payload=ConfigPayload("set", "section", "option", ["a"]))
+        bus.send(Events.CONFIG_CHANGE, payload=ConfigPayload("set", "section", "option", ["b"]))
+
+        receiver.assert_called_once()
+
+    def test_subscriber_filters(self, bus):
+        class Subject(Subscriber):
+            @on(Events.SESSION_END, where={"type": SessionType.POMODORO})
+            def pomodoro_ended(self, payload):
+                return payload.type
+
+        subject = Subject()
+        subject.connect(bus)
+
+        assert bus.send(Events.SESSION_END, payload=self.pomodoro(SessionType.SHORT_BREAK)) == []
+        assert bus.send(Events.SESSION_END, payload=self.pomodoro()) == [SessionType.POMODORO]
+
+
+class TestStats:
+    class Subject(Subscriber):
+        @on(Events.SESSION_START)
+        def started(self, **__):
+            return True
+
+        @on(Events.SESSION_END)
+        def ended(self, **__):
+            raise OSError("disk full")
+
+    def test_disabled_by_default(self, bus):
+        subject = self.Subject()
+        subject.connect(bus)
+
+        bus.send(Events.SESSION_START)
+
+        assert bus.stats() == []
+
+    def test_counts_calls_and_errors_per_event_and_receiver(self, bus):
+        subject = self.Subject()
+        subject.connect(bus)
+        bus.enable_stats()
+
+        bus.send(Events.SESSION_START)
+        bus.send(Events.SESSION_START)
+        with pytest.raises(OSError):
+            bus.send(Events.SESSION_END)
+
+        stats = {(stats.event, stats.receiver): stats for stats in bus.stats()}
+        started = stats[(Events.SESSION_START, "TestStats.Subject.started")]
+        ended = stats[(Events.SESSION_END, "TestStats.Subject.ended")]
+        assert (started.calls, started.errors) == (2, 0)
+        assert (ended.calls, ended.errors) == (1, 1)
+        assert sum(started.buckets) == 2
+        assert 0 < started.percentile(99) <= started.max
+
+    def test_measures_receivers_connected_later(self, bus, mocker):
+        bus.enable_stats()
+        receiver = mocker.Mock()
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+
+        bus.send(Events.SESSION_START)
+
+        assert [stats.calls for stats in bus.stats()] == [1]
+
+    def test_disable_keeps_the_collected_stats(self, bus):
+        subject = self.Subject()
+        subject.connect(bus)
+        bus.enable_stats()
+        bus.send(Events.SESSION_START)
+
+        bus.disable_stats()
+        bus.send(Events.SESSION_START)
+
+        assert {stats.receiver: stats.calls for stats in bus.stats()} == {
+            "TestStats.Subject.started": 1,
+            "TestStats.Subject.ended": 0,
+        }
+
+    def test_histogram_buckets(self):
+        stats = ReceiverStats(Events.SESSION_START, "receiver")
+
+        for seconds in (0.000_000_5, 0.000_003, 0.001, 100):
+            stats.record(seconds)
+
+        assert [bucket for bucket, count in enumerate(stats.buckets) if count] == [0, 2, 10, ReceiverStats.BUCKETS - 1]
+        assert stats.percentile(50) == pytest.approx(0.000_004)
+        assert stats.percentile(100) == 100
+
+    def test_report(self, bus):
+        subject = self.Subject()
+        subject.connect(bus)
+        bus.enable_stats()
+        bus.send(Events.SESSION_START)
+
+        lines = bus.stats_report().splitlines()
+
+        assert lines[0].split()[:3] == ["event", "receiver", "calls"]
+        assert lines[1].split()[:4] == ["SESSION_START", "TestStats.Subject.started", "1", "0"]
+
+
+class TestPost:
+    PRODUCERS = 16
+    POSTS = 500
+
+    @pytest.fixture
+    def bus(self, clock) -> Bus:
+        return Bus(clock)
+
+    def produce(self, bus):
+        def run(number):
+            for count in range(self.POSTS):
+                bus.post(Events.CONFIG_CHANGE, payload=(number, count))
+
+        threads = [threading.Thread(target=run, args=(number,)) for number in range(self.PRODUCERS)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def test_delivers_on_the_main_loop(self, bus, clock, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+
+        thread = threading.Thread(target=bus.post, args=(Events.SESSION_START,), kwargs={"payload": "payload"})
+        thread.start()
+        thread.join()
+        receiver.assert_not_called()
+
+        clock.advance(0)
+
+        receiver.assert_called_once_with(Events.SESSION_START, payload="payload")
+
+    def test_goes_through_the_queue_when_it_is_enabled(self, bus, clock, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.SESSION_START, receiver, weak=False)
+        bus.enable_queue(clock)
+
+        bus.post(Events.SESSION_START)
+        clock.advance(0)
+
+        receiver.assert_called_once_with(Events.SESSION_START, payload=None)
+        assert bus.queue_stats().queued == 1
+
+    def test_many_producers_wake_the_main_loop_up_once(self, bus, clock, mocker):
+        receiver = mocker.Mock()
+        bus.connect(Events.CONFIG_CHANGE, receiver, weak=False)
+
+        for thread in self.produce(bus):
+            thread.join()
+        clock.advance(0)
+
+        payloads = [c.kwargs["payload"] for c in receiver.call_args_list]
+        assert len(payloads) == self.PRODUCERS * self.POSTS
+        for number in range(self.PRODUCERS):
+            assert [count for n, count in payloads if n == number] == list(range(self.POSTS))
+        assert bus.queue_stats().wakeups == 1
+
+    def test_many_producers_into_a_running_loop(self):
+        loop = asyncio.new_event_loop()
+        bus = Bus(AsyncioClock(loop))
+        payloads = []
+        done = loop.create_future()
+
+        def receiver(_, payload):
+            assert threading.current_thread() is threading.main_thread()
+            payloads.append(payload)
+            if len(payloads) == self.PRODUCERS * self.POSTS:
+                done.set_result(True)
+
+        bus.connect(Events.CONFIG_CHANGE, receiver, weak=False)
+
+        try:
+            threads = self.produce(bus)
+            loop.run_until_complete(asyncio.wait_for(done, 10))
+        finally:
+            loop.close()
+
+        for thread in threads:
+            thread.join()
+        assert len(set(payloads)) == self.PRODUCERS * self.POSTS
+        assert bus.queue_stats().wakeups < len(payloads)
+
+    def test_needs_the_main_loop_clock(self):
+        with pytest.raises(RuntimeError):
+            Bus().post(Events.SESSION_START)
+
+
+class TestSubscriber:
+    def test_collects_handlers_once_per_class(self):
+        class Subject(Subscriber):
+            @on(Events.SESSION_START, Events.SESSION_END)
+            def session_changed(self, **__):
+                pass
+
+            @on(Events.TIMER_UPDATE, granularity=Granularity.MINUTE)
+            def minute_changed(self, **__):
+                pass
+
+        assert Subject._handlers == (
+            ("minute_changed", (Events.TIMER_UPDATE,), Granularity.MINUTE, None, None),
+            ("session_changed", (Events.SESSION_START, Events.SESSION_END), None, None, None),
+        )
+
+    def test_does_not_evaluate_properties(self, bus, mocker):
+        getter = mocker.Mock()
+
+        class Subject(Subscriber):
+            value = property(getter)
+
+            @on(Events.SESSION_START)
+            def started(self, **__):
+                return True
+
+        subject = Subject()
+        subject.connect(bus)
+
+        getter.assert_not_called()
+        assert bus.send(Events.SESSION_START) == [True]
+
+    def test_subclass_overrides_handlers(self, bus):
+        class Parent(Subscriber):
+            @on(Events.SESSION_START)
+            def started(self, **__):
+                return "parent"
+
+            @on(Events.SESSION_END)
+            def ended(self, **__):
+                return "parent"
+
+        class Child(Parent):
+            @on(Events.SESSION_START)
+            def started(self, **__):
+                return "child"
+
+            def ended(self, **__):
+                return "child"
+
+        child = Child()
+        child.connect(bus)
+
+        assert bus.send(Events.SESSION_START) == ["child"]
+        assert bus.send(Events.SESSION_END) == []
+
+
+def test_module(graph, clock):
+    graph.register_instance("tomate.clock", clock)
     scan_to_graph(["tomate.pomodoro.event"], graph)
     instance = graph.get("tomate.bus")
 
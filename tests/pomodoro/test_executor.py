@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+from wiring.scanning import scan_to_graph
+
+from tomate.pomodoro import Events, Executor, Subscriber, on
+from tomate.pomodoro.event import snapshot
+from tomate.pomodoro.timer import Payload as TimerPayload
+
+
+@pytest.fixture
+def executor(bus, clock) -> Executor:
+    instance = Executor(bus, clock)
+    yield instance
+    instance.shutdown()
+
+
+def test_module(graph, bus, clock):
+    graph.register_instance("tomate.bus", bus)
+    graph.register_instance("tomate.clock", clock)
+    scan_to_graph(["tomate.pomodoro.executor"], graph)
+
+    instance = graph.get("tomate.executor")
+
+    assert isinstance(instance, Executor)
+    assert graph.get("tomate.executor") is instance
+    instance.shutdown()
+
+
+class Blocking(Subscriber):
+    def __init__(self):
+        self.threads = []
+        self.payloads = []
+
+    @on(Events.SESSION_END, executor=Executor.BACKGROUND)
+    def save(self, payload):
+        self.threads.append(threading.current_thread())
+        self.payloads.append(payload)
+        return "saved"
+
+
+def test_runs_background_receivers_on_a_worker_thread(bus, executor):
+    subscriber = Blocking()
+    subscriber.connect(bus)
+
+    future = bus.send(Events.SESSION_END, payload={"count": 1})[0]
+
+    assert future.result(timeout=5) == "saved"
+    assert subscriber.threads[0] is not threading.main_thread()
+
+
+def test_hands_a_copy_of_mutable_payloads_to_the_worker(bus, executor):
+    subscriber = Blocking()
+    subscriber.connect(bus)
+    payload = {"count": 1}
+
+    bus.send(Events.SESSION_END, payload=payload)[0].result(timeout=5)
+
+    assert subscriber.payloads == [payload]
+    assert subscriber.payloads[0] is not payload
+
+
+def test_hands_immutable_payloads_as_they_are():
+    payload = TimerPayload(time_left=10, duration=20)
+
+    assert snapshot(payload) is payload
+
+
+def test_runs_background_receivers_inline_without_an_executor(bus):
+    subscriber = Blocking()
+    subscriber.connect(bus)
+
+    assert bus.send(Events.SESSION_END) == ["saved"]
+    assert subscriber.threads == [threading.current_thread()]
+
+
+def test_runs_foreground_receivers_on_the_calling_thread(bus, executor):
+    threads = []
+
+    def receiver(_, **__):
+        threads.append(threading.current_thread())
+
+    bus.connect(Events.SESSION_END, receiver, weak=False)
+    bus.send(Events.SESSION_END)
+
+    assert threads == [threading.current_thread()]
+
+
+def test_call_soon_runs_on_the_main_loop(clock, executor, mocker):
+    callback = mocker.Mock()
+
+    executor.submit(executor.call_soon, callback, "done").result(timeout=5)
+    callback.assert_not_called()
+
+    clock.advance(0)
+
+    callback.assert_called_once_with("done")
+
+
+def test_logs_receiver_errors(executor, mocker):
+    logger = mocker.patch("tomate.pomodoro.executor.logger")
+
+    future = executor.submit(mocker.Mock(side_effect=OSError("disk full")))
+
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+    executor.shutdown()
+
+    logger.error.assert_called_once()
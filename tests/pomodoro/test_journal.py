@@ -0,0 +1,130 @@
+import uuid
+
+import pytest
+
+from tomate.pomodoro import (
+    ConfigPayload,
+    Events,
+    Granularity,
+    Journal,
+    SessionPayload,
+    SessionType,
+    TimerPayload,
+    journal,
+)
+from tomate.pomodoro.journal import Record
+
+
+@pytest.fixture
+def path(tmpdir) -> str:
+    return tmpdir.join("events.journal").strpath
+
+
+PAYLOADS = [
+    (Events.SESSION_START, SessionPayload(uuid.uuid4(), SessionType.POMODORO, 0, 1500), None),
+    (Events.TIMER_UPDATE, TimerPayload(time_left=1499, duration=1500, skew=0.25), None),
+    (Events.TIMER_UPDATE, TimerPayload(time_left=1499, duration=1500, remaining=1498.5), Granularity.TICK),
+    (Events.CONFIG_CHANGE, ConfigPayload("set", "timer", "pomodoro_duration", "25"), None),
+    (
+        Events.CONFIG_CHANGE,
+        ConfigPayload(
+            "batch",
+            "timer",
+            "",
+            "",
+            changes=(
+                ConfigPayload("set", "timer", "pomodoro_duration", "25"),
+                ConfigPayload("remove", "timer", "shortbreak_duration", ""),
+            ),
+        ),
+        None,
+    ),
+    (Events.WINDOW_HIDE, None, None),
+]
+
+
+def test_records_the_events_the_bus_delivers(bus, clock, path):
+    recorder = Journal(path, clock)
+    recorder.attach(bus)
+
+    for event, payload, granularity in PAYLOADS:
+        clock.stall(1)
+        bus.send(event, payload=payload, granularity=granularity)
+    recorder.close()
+
+    assert list(journal.read(path)) == [
+        Record(time, event, payload, granularity) for time, (event, payload, granularity) in enumerate(PAYLOADS, 1)
+    ]
+
+
+def test_records_published_events(bus, clock, path):
+    recorder = Journal(path, clock)
+    recorder.attach(bus)
+    bus.enable_queue(clock)
+
+    bus.publish(Events.SESSION_END)
+    recorder.flush()
+    assert list(journal.read(path)) == []
+
+    clock.advance(0)
+    recorder.detach(bus)
+    bus.send(Events.SESSION_START)
+    recorder.close()
+
+    assert [record.event for record in journal.read(path)] == [Events.SESSION_END]
+
+
+def test_appends_to_an_existing_journal(clock, path):
+    for event in (Events.SESSION_START, Events.SESSION_END):
+        recorder = Journal(path, clock)
+        recorder.record(event)
+        recorder.close()
+
+    assert [record.event for record in journal.read(path)] == [Events.SESSION_START, Events.SESSION_END]
+
+
+def test_ignores_a_truncated_last_record(clock, path):
+    recorder = Journal(path, clock)
+    recorder.record(Events.SESSION_START)
+    recorder.record(Events.SESSION_END)
+    recorder.close()
+
+    with open(path, "r+b") as file:
+        file.truncate(file.seek(0, 2) - 1)
+
+    assert [record.event for record in journal.read(path)] == [Events.SESSION_START]
+
+
+def test_rejects_other_files(path):
+    with open(path, "wb") as file:
+        file.write(b"[timer]\n")
+
+    with pytest.raises(ValueError):
+        list(journal.read(path))
+
+
+def test_replays_as_fast_as_possible(bus, mocker):
+    receiver = mocker.Mock()
+    bus.connect(Events.TIMER_UPDATE, receiver, weak=False, granularity=Granularity.TICK)
+    records = [Record(time, event, payload, granularity) for time, (event, payload, granularity) in enumerate(PAYLOADS)]
+
+    assert journal.replay(records, bus) == len(records)
+
+    assert [c.kwargs["payload"].remaining for c in receiver.call_args_list] == [None, 1498.5]
+
+
+def test_replays_in_real_time(bus, clock, mocker):
+    receiver = mocker.Mock()
+    bus.connect(Events.SESSION_START, receiver, weak=False)
+    records = [Record(10.0, Events.SESSION_START, None, None), Record(12.5, Events.SESSION_START, None, None)]
+
+    journal.replay(records, bus, clock)
+
+    clock.advance(0)
+    assert receiver.call_count == 1
+
+    clock.advance(2)
+    assert receiver.call_count == 1
+
+    clock.advance(0.5)
+    assert receiver.call_count == 2
@@ -0,0 +1,79 @@
+import copy
+import pickle
+
+import pytest
+
+from tomate.pomodoro import SessionPayload, SessionType, TimerPayload
+
+
+class TestImmutable:
+    def test_has_no_instance_dict(self):
+        payload = TimerPayload(time_left=10, duration=20)
+
+        assert not hasattr(payload, "__dict__")
+
+    def test_is_read_only(self):
+        payload = TimerPayload(time_left=10, duration=20)
+
+        with pytest.raises(AttributeError):
+            payload.time_left = 5
+
+        with pytest.raises(AttributeError):
+            del payload.duration
+
+    def test_compares_and_hashes_by_fields(self):
+        payload = TimerPayload(time_left=10, duration=20)
+
+        assert payload == TimerPayload(10, 20, 0.0, None)
+        assert payload != TimerPayload(time_left=9, duration=20)
+        assert hash(payload) == hash(TimerPayload(time_left=10, duration=20))
+        assert payload != (10, 20, 0.0, None)
+
+    def test_behaves_like_the_namedtuple_it_replaces(self):
+        payload = TimerPayload(time_left=10, duration=20)
+
+        assert tuple(payload) == (10, 20, 0.0, None)
+        assert payload._asdict() == {"time_left": 10, "duration": 20, "skew": 0.0, "remaining": None}
+        assert payload._replace(time_left=5) == TimerPayload(time_left=5, duration=20)
+        assert repr(payload) == "TimerPayload(time_left=10, duration=20, skew=0.0, remaining=None)"
+
+    def test_copies_and_pickles(self):
+        payload = TimerPayload(time_left=10, duration=20, remaining=9.5)
+
+        assert copy.deepcopy(payload) == payload
+        assert pickle.loads(pickle.dumps(payload)) == payload
+
+
+class TestTimerPayload:
+    def test_derives_values_once(self):
+        payload = TimerPayload(time_left=90, duration=100)
+
+        assert payload.countdown == "01:30"
+        assert payload.countdown is payload.countdown
+        assert payload.remaining_ratio == 0.9
+        assert payload.elapsed_percent == 10
+
+    def test_does_not_copy_cached_values(self):
+        payload = TimerPayload(time_left=90, duration=100)
+        assert payload.countdown == "01:30"
+
+        assert payload._replace(time_left=30).countdown == "00:30"
+
+
+class TestSessionPayload:
+    def test_generates_the_id_when_it_is_read(self, mocker):
+        uuid4 = mocker.patch("uuid.uuid4", return_value="1234")
+        payload = SessionPayload(type=SessionType.POMODORO, pomodoros=0, duration=1500)
+
+        uuid4.assert_not_called()
+        assert payload.id == "1234"
+        assert payload.id == "1234"
+        uuid4.assert_called_once_with()
+
+    def test_keeps_the_id_when_replaced(self):
+        payload = SessionPayload(type=SessionType.POMODORO, pomodoros=0, duration=1500)
+
+        assert payload._replace(pomodoros=1).id == payload.id
+
+    def test_countdown(self):
+        assert SessionPayload(type=SessionType.SHORT_BREAK, duration=300).countdown == "05:00"
@@ -0,0 +1,86 @@
+import pytest
+from wiring.scanning import scan_to_graph
+
+from tomate.pomodoro import Events, SessionRegistry, SessionType
+from tomate.pomodoro.session import State
+
+
+@pytest.fixture
+def registry(bus, config, clock) -> SessionRegistry:
+    return SessionRegistry(bus, config, clock)
+
+
+def test_module(graph, bus, config, clock):
+    graph.register_instance("tomate.bus", bus)
+    graph.register_instance("tomate.config", config)
+    graph.register_instance("tomate.clock", clock)
+    scan_to_graph(["tomate.pomodoro.registry"], graph)
+
+    instance = graph.get("tomate.registry")
+
+    assert isinstance(instance, SessionRegistry)
+    assert graph.get("tomate.registry") is instance
+
+
+def test_creates_ready_sessions(registry):
+    tenant = registry.create("alice")
+
+    assert "alice" in registry
+    assert len(registry) == 1
+    assert registry.get("alice") is tenant
+    assert tenant.session.state == State.STOPPED
+
+
+def test_does_not_create_the_same_session_twice(registry):
+    registry.create("alice")
+
+    with pytest.raises(ValueError):
+        registry.create("alice")
+
+
+def test_routes_events_per_session(registry, clock, mocker):
+    alice = registry.create("alice")
+    bob = registry.create("bob")
+    alice_ended = mocker.Mock()
+    alice.bus.connect(Events.SESSION_END, alice_ended, weak=False)
+    bob_ended = mocker.Mock()
+    bob.bus.connect(Events.SESSION_END, bob_ended, weak=False)
+
+    alice.session.start()
+    clock.advance(25 * 60)
+
+    alice_ended.assert_called_once()
+    bob_ended.assert_not_called()
+    assert alice.session.current == SessionType.SHORT_BREAK
+    assert bob.session.current == SessionType.POMODORO
+
+
+def test_remove_stops_the_timer(registry, clock):
+    tenant = registry.create("alice")
+    tenant.session.start()
+
+    registry.remove("alice")
+    clock.advance(1)
+
+    assert "alice" not in registry
+    assert tenant.timer.is_running() is False
+    assert clock.pending() == 0
+
+
+def test_shares_the_config_between_sessions(registry, config, mocker):
+    alice = registry.create("alice")
+    bob = registry.create("bob")
+    changed = mocker.Mock()
+    bob.bus.connect(Events.SESSION_CHANGE, changed, weak=False)
+
+    config.set("Timer", "pomodoro_duration", 30)
+
+    assert alice.session.duration == bob.session.duration == 30 * 60
+    changed.assert_called_once()
+
+
+def test_sessions_have_no_instance_dict(registry):
+    tenant = registry.create("alice")
+
+    assert not hasattr(tenant.session, "__dict__")
+    assert not hasattr(tenant.timer, "__dict__")
@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from tomate.pomodoro.resources import ResourceIndex, remove_duplicates
+
+
+@pytest.fixture
+def directory(tmpdir):
+    return tmpdir.mkdir("data")
+
+
+@pytest.fixture
+def path(tmpdir):
+    return tmpdir.join("cache", "resources.json").strpath
+
+
+def test_remove_duplicates_keeps_the_first_of_each_in_order():
+    assert remove_duplicates(["b", "a", "b", "c", "a"]) == ["b", "a", "c"]
+
+
+class TestResourceIndex:
+    def test_resolves_once_per_run(self, path, directory, mocker):
+        resolve = mocker.Mock(return_value=("value", [directory.strpath]))
+        index = ResourceIndex(path)
+
+        assert index.lookup("key", resolve) == "value"
+        assert index.lookup("key", resolve) == "value"
+
+        resolve.assert_called_once_with()
+        assert (index.hits, index.misses) == (1, 1)
+
+    def test_keeps_the_values_between_runs(self, path, directory, mocker):
+        ResourceIndex(path).lookup("key", lambda: ("value", [directory.strpath]))
+        resolve = mocker.Mock()
+
+        assert ResourceIndex(path).lookup("key", resolve) == "value"
+        resolve.assert_not_called()
+
+    def test_resolves_again_when_a_directory_changed(self, path, directory, mocker):
+        ResourceIndex(path).lookup("key", lambda: ("old", [directory.strpath]))
+        directory.join("icon.png").write("")
+        stat = os.stat(directory.strpath)
+        os.utime(directory.strpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert ResourceIndex(path).lookup("key", lambda: ("new", [directory.strpath])) == "new"
+
+    def test_resolves_again_when_a_missing_directory_appears(self, path, tmpdir):
+        missing = tmpdir.join("missing")
+        ResourceIndex(path).lookup("key", lambda: (None, [missing.strpath]))
+        missing.mkdir()
+
+        assert ResourceIndex(path).lookup("key", lambda: ("found", [missing.strpath])) == "found"
+
+    def test_drops_the_file_of_other_search_directories(self, path, directory, mocker):
+        ResourceIndex(path, scope=["/first"]).lookup("key", lambda: ("value", [directory.strpath]))
+        resolve = mocker.Mock(return_value=("other", []))
+
+        assert ResourceIndex(path, scope=["/second"]).lookup("key", resolve) == "other"
+
+    def test_ignores_a_broken_file(self, path, tmpdir):
+        tmpdir.mkdir("cache").join("resources.json").write("{broken")
+
+        assert ResourceIndex(path).lookup("key", lambda: ("value", [])) == "value"
+        with open(path) as f:
+            assert json.load(f)["entries"]["key"]["value"] == "value"
+
+    def test_keeps_working_when_the_file_cannot_be_written(self, tmpdir, directory):
+        blocked = tmpdir.join("blocked")
+        blocked.write("")
+        index = ResourceIndex(blocked.join("resources.json").strpath)
+
+        assert index.lookup("key", lambda: ("value", [directory.strpath])) == "value"
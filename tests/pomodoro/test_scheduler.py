@@ -0,0 +1,151 @@
+import pytest
+from wiring.scanning import scan_to_graph
+
+from tomate.pomodoro import Events, Scheduler, Timer, WheelScheduler
+
+
+def test_module(clock, graph):
+    graph.register_instance("tomate.clock", clock)
+    scan_to_graph(["tomate.pomodoro.scheduler"], graph)
+
+    instance = graph.get("tomate.scheduler")
+
+    assert isinstance(instance, Scheduler)
+    assert graph.get("tomate.scheduler") is instance
+
+
+def test_runs_callback_once(clock, scheduler, mocker):
+    callback = mocker.Mock(return_value=True)
+    scheduler.schedule("owner", 1, callback)
+
+    clock.advance(5)
+
+    callback.assert_called_once_with()
+    assert scheduler.live() == 0
+    assert clock.pending() == 0
+
+
+def test_keeps_one_source_per_owner(clock, scheduler, mocker):
+    first = mocker.Mock()
+    second = mocker.Mock()
+
+    scheduler.schedule("owner", 1, first)
+    scheduler.schedule("owner", 2, second)
+
+    assert scheduler.live() == 1
+    assert clock.pending() == 1
+
+    clock.advance(2)
+
+    first.assert_not_called()
+    second.assert_called_once_with()
+
+
+def test_callback_can_schedule_its_owner_again(clock, scheduler, mocker):
+    callback = mocker.Mock(
+        side_effect=lambda: scheduler.schedule("owner", 1, callback) if callback.call_count < 3 else None
+    )
+
+    scheduler.schedule("owner", 1, callback)
+    clock.advance(10)
+
+    assert callback.call_count == 3
+    assert scheduler.is_scheduled("owner") is False
+
+
+def test_cancel(clock, scheduler, mocker):
+    callback = mocker.Mock()
+    scheduler.schedule("owner", 1, callback)
+
+    assert scheduler.cancel("owner") is True
+    assert scheduler.cancel("owner") is False
+
+    clock.advance(1)
+
+    callback.assert_not_called()
+    assert clock.pending() == 0
+
+
+class TestWheelScheduler:
+    @pytest.fixture
+    def wheel(self, clock) -> WheelScheduler:
+        return WheelScheduler(clock, resolution=0.1)
+
+    def test_runs_callbacks_from_a_single_source(self, clock, wheel, mocker):
+        calls = mocker.Mock()
+        for owner, seconds in enumerate([0.5, 0.1, 7, 0.25]):
+            wheel.schedule(owner, seconds, lambda owner=owner: calls(owner, clock.monotonic()))
+
+        assert wheel.live() == 4
+        assert clock.pending() == 1
+
+        clock.advance(10)
+
+        assert calls.call_args_list == [
+            mocker.call(1, pytest.approx(0.1)),
+            mocker.call(3, pytest.approx(0.3)),
+            mocker.call(0, pytest.approx(0.5)),
+            mocker.call(2, pytest.approx(7)),
+        ]
+        assert wheel.live() == 0
+        assert clock.pending() == 0
+
+    @pytest.mark.parametrize("levels,seconds", [(4, 6.4), (4, 409.6), (3, 26214.4), (2, 1000)])
+    def test_cascades_callbacks_from_the_upper_levels(self, levels, seconds, clock, mocker):
+        # the 2 levels wheel reaches 409.5 seconds, farther callbacks wait in its last slot
+        wheel = type("Wheel", (WheelScheduler,), {"LEVELS": levels})(clock, resolution=0.1)
+        callback = mocker.Mock()
+        wheel.schedule("owner", seconds, lambda: callback(clock.monotonic()))
+
+        clock.advance(seconds - 0.2)
+        callback.assert_not_called()
+
+        clock.advance(0.3)
+        # the periodic source itself drifts over the hundred thousand ticks
+        callback.assert_called_once_with(pytest.approx(seconds, abs=wheel.resolution))
+
+    def test_cancel(self, clock, wheel, mocker):
+        callback = mocker.Mock()
+        wheel.schedule("owner", 1, callback)
+
+        assert wheel.cancel("owner") is True
+        assert wheel.cancel("owner") is False
+        assert wheel.is_scheduled("owner") is False
+
+        clock.advance(1)
+
+        callback.assert_not_called()
+        assert clock.pending() == 0
+
+    def test_callback_cancels_another_callback_of_the_same_tick(self, clock, wheel, mocker):
+        second = mocker.Mock()
+        wheel.schedule("first", 1, lambda: wheel.cancel("second"))
+        wheel.schedule("second", 1, second)
+
+        clock.advance(1)
+
+        second.assert_not_called()
+
+    def test_catches_up_the_ticks_a_blocked_loop_missed(self, clock, wheel, mocker):
+        callback = mocker.Mock()
+        wheel.schedule("first", 0.2, lambda: callback("first"))
+        wheel.schedule("second", 0.4, lambda: callback("second"))
+
+        clock.stall(1)
+        clock.advance(0)
+
+        assert callback.call_args_list == [mocker.call("first"), mocker.call("second")]
+
+    def test_drives_many_timers(self, bus, clock, wheel, mocker):
+        finished = mocker.Mock()
+        bus.connect(Events.TIMER_END, finished, weak=False)
+        timers = [Timer(bus, wheel) for _ in range(100)]
+
+        for index, timer in enumerate(timers):
+            timer.start(60 + index)
+
+        clock.run()
+
+        assert finished.call_count == 100
+        assert clock.monotonic() == pytest.approx(159)
+        assert all(not timer.is_running() for timer in timers)
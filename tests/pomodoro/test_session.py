@@ -4,15 +4,16 @@ from wiring.scanning import scan_to_graph
 from tomate.pomodoro import Events, Session, SessionPayload, SessionType
 from tomate.pomodoro.session import State
 from tomate.pomodoro.config import Config
-from tomate.ui.testing import create_session_payload, run_loop_for
+from tomate.ui.testing import create_session_payload
 
 
 @pytest.fixture()
-def session(graph, config, bus, mocker):
+def session(graph, config, bus, clock, mocker):
     graph.register_instance("tomate.bus", bus)
+    graph.register_instance("tomate.clock", clock)
     graph.register_instance("tomate.config", config)
     mocker.patch("uuid.uuid4", return_value="1234")
-    scan_to_graph(["tomate.pomodoro.timer", "tomate.pomodoro.session"], graph)
+    scan_to_graph(["tomate.pomodoro.scheduler", "tomate.pomodoro.timer", "tomate.pomodoro.session"], graph)
     return graph.get("tomate.session")
 
 
@@ -146,6 +147,7 @@ class TestSessionEnd:
         new_pomodoros,
         config,
         bus,
+        clock,
         mocker,
         session,
     ):
@@ -162,7 +164,7 @@ class TestSessionEnd:
 
         session.ready()
         session.start()
-        run_loop_for(2)
+        clock.advance(1)
 
         payload = create_session_payload(
             type=old_session,
@@ -172,7 +174,7 @@ class TestSessionEnd:
         subscriber.assert_called_once_with(Events.SESSION_END, payload=payload)
         assert session.current is new_session
 
-    def test_changes_session_type(self, bus, config, mocker, session):
+    def test_changes_session_type(self, bus, clock, config, mocker, session):
         config.set(config.DURATION_SECTION, config.DURATION_POMODORO, 0.02)
         config.parser.getint = config.parser.getfloat
 
@@ -181,7 +183,7 @@ class TestSessionEnd:
 
         session.ready()
         session.start()
-        run_loop_for(2)
+        clock.advance(1)
 
         payload = SessionPayload(
             id="1234",
@@ -191,6 +193,36 @@ class TestSessionEnd:
         )
         subscriber.assert_called_once_with(Events.SESSION_CHANGE, payload=payload)
 
+    def test_ends_once_when_system_resumes_after_the_deadline(self, bus, clock, mocker, session):
+        subscriber = mocker.Mock()
+        bus.connect(Events.SESSION_END, subscriber, False)
+
+        session.ready()
+        session.start()
+        clock.advance(60)
+        clock.suspend(60 * 60)
+        clock.run()
+
+        subscriber.assert_called_once_with(Events.SESSION_END, payload=create_session_payload(pomodoros=1))
+        assert session.current is SessionType.SHORT_BREAK
+
+    def test_simulates_a_day_of_sessions(self, bus, clock, config, mocker, session):
+        subscriber = mocker.Mock()
+        bus.connect(Events.SESSION_END, subscriber, False)
+
+        session.ready()
+        for _ in range(16):
+            session.start()
+            clock.run()
+
+        assert session.pomodoros == 8
+        assert session.current is SessionType.POMODORO
+        assert [c.kwargs["payload"].type for c in subscriber.call_args_list[-2:]] == [
+            SessionType.POMODORO,
+            SessionType.LONG_BREAK,
+        ]
+        assert clock.monotonic() == 8 * 25 * 60 + 6 * 5 * 60 + 2 * 15 * 60
+
 
 class TestSessionChange:
     @pytest.mark.parametrize("state", [State.INITIAL, State.STARTED])
@@ -1,13 +1,13 @@
 import pytest
 from wiring.scanning import scan_to_graph
 
-from tomate.pomodoro import Events, Timer, TimerPayload
+from tomate.pomodoro import Events, Granularity, Timer, TimerPayload
 from tomate.pomodoro.timer import State
-from tomate.ui.testing import run_loop_for
 
 
-def test_module(bus, graph):
+def test_module(bus, scheduler, graph):
     graph.register_instance("tomate.bus", bus)
+    graph.register_instance("tomate.scheduler", scheduler)
     scan_to_graph(["tomate.pomodoro.timer"], graph)
 
     instance = graph.get("tomate.timer")
@@ -16,15 +16,15 @@ def test_module(bus, graph):
 
 
 class TestTimerStart:
-    def test_not_start_when_timer_is_already_running(self, bus):
-        timer = Timer(bus)
+    def test_not_start_when_timer_is_already_running(self, bus, scheduler):
+        timer = Timer(bus, scheduler)
         timer.state = State.STARTED
 
         assert not timer.start(60)
 
     @pytest.mark.parametrize("state", [State.ENDED, State.STOPPED])
-    def test_starts_when_timer_not_started_yet(self, bus, mocker, state):
-        timer = Timer(bus)
+    def test_starts_when_timer_not_started_yet(self, bus, scheduler, mocker, state):
+        timer = Timer(bus, scheduler)
         timer.state = state
 
         subscriber = mocker.Mock()
@@ -33,19 +33,21 @@ class TestTimerStart:
         result = timer.start(60)
 
         assert result is True
-        subscriber.assert_called_once_with(Events.TIMER_START, payload=TimerPayload(time_left=60, duration=60))
+        subscriber.assert_called_once_with(
+            Events.TIMER_START, payload=TimerPayload(time_left=60, duration=60, remaining=60)
+        )
 
 
 class TestTimerStop:
     @pytest.mark.parametrize("state", [State.ENDED, State.STOPPED])
-    def test_not_stop_when_timer_is_not_running(self, bus, state):
-        timer = Timer(bus)
+    def test_not_stop_when_timer_is_not_running(self, bus, scheduler, state):
+        timer = Timer(bus, scheduler)
         timer.state = state
 
         assert not timer.stop()
 
-    def test_stops_when_timer_is_running(self, bus, mocker):
-        timer = Timer(bus)
+    def test_stops_when_timer_is_running(self, bus, scheduler, mocker):
+        timer = Timer(bus, scheduler)
         subscriber = mocker.Mock()
         bus.connect(Events.TIMER_STOP, subscriber, weak=False)
 
@@ -54,19 +56,47 @@ class TestTimerStop:
 
         assert result is True
         assert timer.is_running() is False
-        subscriber.assert_called_once_with(Events.TIMER_STOP, payload=TimerPayload(time_left=0, duration=0))
+        subscriber.assert_called_once_with(
+            Events.TIMER_STOP, payload=TimerPayload(time_left=0, duration=0, remaining=0)
+        )
+
+    def test_replaces_the_tick_source_when_restarted(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        changed = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, changed, weak=False)
+
+        timer.start(60)
+        clock.advance(0.5)
+        timer.stop()
+        timer.start(60)
+        clock.advance(1)
+
+        assert scheduler.live() == 1
+        assert clock.pending() == 1
+        changed.assert_called_once_with(
+            Events.TIMER_UPDATE, payload=TimerPayload(time_left=59, duration=60, remaining=59)
+        )
+
+    def test_cancels_the_tick_source(self, bus, clock, scheduler):
+        timer = Timer(bus, scheduler)
+
+        timer.start(60)
+        timer.stop()
+
+        assert scheduler.live() == 0
+        assert clock.pending() == 0
 
 
 class TestTimerEnd:
     @pytest.mark.parametrize("state", [State.ENDED, State.STOPPED])
-    def test_not_end_when_timer_is_not_running(self, bus, state):
-        timer = Timer(bus)
+    def test_not_end_when_timer_is_not_running(self, bus, scheduler, state):
+        timer = Timer(bus, scheduler)
         timer.state = state
 
         assert not timer.end()
 
-    def test_ends_when_time_is_up(self, bus, mocker):
-        timer = Timer(bus)
+    def test_ends_when_time_is_up(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
         changed = mocker.Mock()
         timer._bus.connect(Events.TIMER_UPDATE, changed, weak=False)
 
@@ -74,11 +104,242 @@ class TestTimerEnd:
         bus.connect(Events.TIMER_END, finished, weak=False)
 
         timer.start(1)
-        run_loop_for(2)
+        clock.advance(1)
+
+        assert timer.is_running() is False
+        changed.assert_called_once_with(Events.TIMER_UPDATE, payload=TimerPayload(time_left=0, duration=1, remaining=0))
+        finished.assert_called_once_with(Events.TIMER_END, payload=TimerPayload(time_left=0, duration=1, remaining=0))
+
+
+class TestTimerUpdate:
+    def test_computes_time_left_from_the_deadline(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        subscriber = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, subscriber, weak=False)
+
+        timer.start(60)
+        clock.advance(0.5)
+        clock.stall(3.0)
+        clock.advance(0.1)
+
+        subscriber.assert_called_once_with(
+            Events.TIMER_UPDATE,
+            payload=TimerPayload(time_left=57, duration=60, skew=pytest.approx(2.5), remaining=56.5),
+        )
+
+    def test_schedules_next_tick_at_the_next_second_boundary(self, bus, clock, scheduler):
+        timer = Timer(bus, scheduler)
+
+        timer.start(60)
+        clock.advance(0.5)
+        clock.stall(3.25)
+        clock.advance(0.1)
+
+        assert timer._wakeup == pytest.approx(4.0)
+
+    def test_ends_at_the_deadline_when_tick_is_late(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        finished = mocker.Mock()
+        bus.connect(Events.TIMER_END, finished, weak=False)
+
+        timer.start(60)
+        clock.advance(59.5)
+        clock.stall(5.0)
+        clock.advance(0.1)
+
+        assert timer.is_running() is False
+        finished.assert_called_once_with(
+            Events.TIMER_END, payload=TimerPayload(time_left=0, duration=60, skew=pytest.approx(4.5), remaining=0)
+        )
+
+    def test_does_not_drift_over_a_whole_session(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        changed = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, changed, weak=False)
+
+        timer.start(25 * 60)
+        clock.advance(25 * 60)
+
+        assert timer.is_running() is False
+        assert changed.call_count == 25 * 60
+
+
+class TestTimerResolution:
+    def test_updates_at_the_given_resolution(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        timer.set_resolution(0.1)
+        tick = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, tick, weak=False, granularity=Granularity.TICK)
+
+        timer.start(2)
+        clock.advance(0.3)
+
+        assert [c.kwargs["payload"].remaining for c in tick.call_args_list] == [1.9, 1.8, 1.7]
+        assert [c.kwargs["payload"].time_left for c in tick.call_args_list] == [2, 2, 2]
+
+    @pytest.mark.parametrize("resolution,ticks", [(0.1, 30), (0.05, 60), (0.25, 12), (1, 3)])
+    def test_coalesces_updates_for_receivers_of_whole_seconds(self, resolution, ticks, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        timer.set_resolution(resolution)
+        tick = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, tick, weak=False, granularity=Granularity.TICK)
+        second = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, second, weak=False)
+
+        timer.start(3)
+
+        assert clock.run() == ticks
+        assert timer.is_running() is False
+        assert tick.call_count == ticks
+        assert [c.kwargs["payload"].time_left for c in second.call_args_list] == [2, 1, 0]
+
+    def test_runs_a_whole_session_at_a_tenth_of_a_second(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        timer.set_resolution(0.1)
+        tick = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, tick, weak=False, granularity=Granularity.TICK)
+        second = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, second, weak=False)
+        finished = mocker.Mock()
+        bus.connect(Events.TIMER_END, finished, weak=False)
+
+        timer.start(25 * 60)
+        clock.run()
+
+        assert clock.monotonic() == pytest.approx(25 * 60)
+        assert tick.call_count == 25 * 60 * 10
+        assert second.call_count == 25 * 60
+        finished.assert_called_once()
+
+    def test_changes_resolution_of_running_timer(self, bus, clock, scheduler):
+        timer = Timer(bus, scheduler)
+
+        timer.start(60)
+        timer.set_resolution(0.25)
+
+        assert clock.advance(1) == 4
+        assert scheduler.live() == 1
+
+    @pytest.mark.parametrize("seconds", [0, -1, 1.5, 0.3, 0.7])
+    def test_rejects_invalid_resolution(self, bus, scheduler, seconds):
+        timer = Timer(bus, scheduler)
+
+        with pytest.raises(ValueError):
+            timer.set_resolution(seconds)
+
+
+class TestTimerTickless:
+    def test_wakes_up_only_at_the_deadline_when_nobody_listens_to_updates(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        finished = mocker.Mock()
+        bus.connect(Events.TIMER_END, finished, weak=False)
+
+        timer.start(60)
+        bus.send(Events.WINDOW_HIDE)
+
+        assert clock.advance(1) == 1
+        assert timer.is_tickless() is True
+        assert clock.advance(59) == 1
+        finished.assert_called_once_with(Events.TIMER_END, payload=TimerPayload(time_left=0, duration=60, remaining=0))
+
+    def test_keeps_ticking_when_window_is_hidden_and_someone_listens_to_updates(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        changed = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, changed, weak=False)
+
+        timer.start(60)
+        bus.send(Events.WINDOW_HIDE)
+
+        assert timer.is_tickless() is False
+        assert clock.advance(60) == 60
+
+    def test_resumes_ticking_when_window_is_shown(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        changed = mocker.Mock()
+
+        timer.start(60)
+        bus.send(Events.WINDOW_HIDE)
+        clock.advance(10.5)
+
+        bus.connect(Events.TIMER_UPDATE, changed, weak=False)
+        bus.send(Events.WINDOW_SHOW)
+        clock.advance(0)
+
+        changed.assert_called_once_with(
+            Events.TIMER_UPDATE, payload=TimerPayload(time_left=50, duration=60, remaining=49.5)
+        )
+        assert clock.advance(10) == 10
+
+    def test_settles_session_that_ended_during_suspend_while_window_is_hidden(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        finished = mocker.Mock()
+        bus.connect(Events.TIMER_END, finished, weak=False)
+
+        timer.start(1500)
+        bus.send(Events.WINDOW_HIDE)
+        clock.advance(300)
+        clock.suspend(3600)
+        clock.advance(Timer.TICKLESS_MAX_SLEEP)
+
+        assert timer.is_running() is False
+        finished.assert_called_once()
+
+
+class TestTimerGranularity:
+    @pytest.mark.parametrize("granularity,elapsed", [(Granularity.MINUTE, 50), (Granularity.PERCENT, 10)])
+    def test_calls_receiver_on_the_first_update_after_a_restart(
+        self, granularity, elapsed, bus, clock, scheduler, mocker
+    ):
+        timer = Timer(bus, scheduler)
+        changed = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, changed, weak=False, granularity=granularity)
+
+        timer.start(1500)
+        clock.advance(elapsed)
+        timer.stop()
+        changed.reset_mock()
+
+        timer.start(1500)
+        clock.advance(1)
+
+        changed.assert_called_once_with(
+            Events.TIMER_UPDATE, payload=TimerPayload(time_left=1499, duration=1500, remaining=1499)
+        )
+
+
+class TestTimerSuspend:
+    def test_settles_session_that_ended_during_suspend(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        changed = mocker.Mock()
+        bus.connect(Events.TIMER_UPDATE, changed, weak=False)
+        finished = mocker.Mock()
+        bus.connect(Events.TIMER_END, finished, weak=False)
+
+        timer.start(60)
+        clock.advance(10)
+        clock.suspend(3600)
+        clock.advance(1)
 
         assert timer.is_running() is False
-        changed.assert_called_once_with(Events.TIMER_UPDATE, payload=TimerPayload(time_left=0, duration=1))
-        finished.assert_called_once_with(Events.TIMER_END, payload=TimerPayload(time_left=0, duration=1))
+        assert changed.call_count == 10
+        finished.assert_called_once_with(
+            Events.TIMER_END, payload=TimerPayload(time_left=0, duration=60, skew=pytest.approx(3551), remaining=0)
+        )
+
+    def test_discounts_suspend_from_time_left(self, bus, clock, scheduler, mocker):
+        timer = Timer(bus, scheduler)
+        changed = mocker.Mock()
+
+        timer.start(60)
+        clock.advance(10)
+        clock.suspend(20)
+        bus.connect(Events.TIMER_UPDATE, changed, weak=False)
+        clock.advance(1)
+
+        assert timer.is_running() is True
+        changed.assert_called_once_with(
+            Events.TIMER_UPDATE, payload=TimerPayload(time_left=29, duration=60, remaining=29)
+        )
 
 
 class TestTimerPayload:
@@ -159,3 +420,8 @@ class TestTimerPayload:
         payload = TimerPayload(time_left=seconds, duration=0)
 
         assert payload.countdown == formatted
+
+    def test_remaining_ratio_uses_fractional_time_left(self):
+        payload = TimerPayload(duration=100, time_left=50, remaining=49.5)
+
+        assert payload.remaining_ratio == 0.495
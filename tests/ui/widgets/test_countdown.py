@@ -35,3 +35,13 @@ def test_updates_countdown_when_session_state_changes(event, payload, bus, count
     bus.send(event, payload=payload)
 
     assert payload.countdown in countdown.widget.get_text()
+
+
+def test_stops_listening_to_timer_updates_while_window_is_hidden(bus, countdown):
+    bus.send(Events.WINDOW_HIDE)
+
+    assert bus.is_connect(Events.TIMER_UPDATE, countdown._update_countdown) is False
+
+    bus.send(Events.WINDOW_SHOW)
+
+    assert bus.is_connect(Events.TIMER_UPDATE, countdown._update_countdown) is True
@@ -1,6 +1,8 @@
 import argparse
+import atexit
 import locale
 import logging
+import sys
 from locale import gettext as _
 
 import gi
@@ -12,6 +14,7 @@ from wiring.scanning import scan_to_graph
 
 from tomate.pomodoro.app import Application
 from tomate.pomodoro.graph import graph
+from tomate.pomodoro.journal import Journal
 
 from gi.repository import Gdk
 
@@ -25,6 +28,11 @@ def main():
         setup_logging(options)
 
         scan_to_graph(["tomate"], graph)
+        if options.bus_stats:
+            setup_bus_stats(graph.get("tomate.bus"))
+        if options.journal:
+            setup_journal(graph.get("tomate.bus"), graph.get("tomate.clock"), options.journal)
+
         app = Application.from_graph(graph)
 
         app.Run()
@@ -42,6 +50,17 @@ def setup_logging(options):
     logging.basicConfig(level=level, format=fmt)
 
 
+def setup_bus_stats(bus):
+    bus.enable_stats()
+    atexit.register(lambda: print(bus.stats_report(), file=sys.stderr))
+
+
+def setup_journal(bus, clock, path):
+    journal = Journal(path, clock)
+    journal.attach(bus)
+    atexit.register(journal.close)
+
+
 def parse_options():
     parser = argparse.ArgumentParser(prog="tomate-gtk")
 
@@ -53,4 +72,17 @@ def parse_options():
         help=_("Show debug messages"),
     )
 
+    parser.add_argument(
+        "--bus-stats",
+        default=False,
+        action="store_true",
+        help=_("Show how long the event receivers took on exit"),
+    )
+
+    parser.add_argument(
+        "--journal",
+        metavar="FILE",
+        help=_("Record the events in FILE"),
+    )
+
     return parser.parse_args()
@@ -1,25 +1,44 @@
 from .app import Application
+from .clock import AsyncioClock, Clock, GLibClock, VirtualClock
 from .config import Config, Payload as ConfigPayload
-from .event import Bus, Events, Subscriber, on
+from .event import Bus, Events, Granularity, Lane, Policy, ReceiverStats, Subscriber, on
+from .executor import Executor
 from .graph import graph
+from .journal import Journal
 from .plugin import Plugin, PluginEngine, suppress_errors
+from .registry import SessionRegistry, Tenant
+from .scheduler import Scheduler, WheelScheduler
 from .session import Payload as SessionPayload, Session, Type as SessionType
 from .timer import Payload as TimerPayload, Timer, format_seconds
 
 __all__ = [
     "Application",
+    "AsyncioClock",
     "Bus",
+    "Clock",
     "Config",
     "ConfigPayload",
     "Events",
+    "Executor",
+    "GLibClock",
+    "Granularity",
+    "Journal",
+    "Lane",
     "Plugin",
     "PluginEngine",
+    "Policy",
+    "ReceiverStats",
+    "Scheduler",
     "Session",
     "SessionPayload",
+    "SessionRegistry",
     "SessionType",
     "Subscriber",
+    "Tenant",
     "Timer",
     "TimerPayload",
+    "VirtualClock",
+    "WheelScheduler",
     "format_seconds",
     "graph",
     "on",
@@ -5,6 +5,8 @@ from dbus.mainloop.glib import DBusGMainLoop
 from wiring import SingletonScope, inject
 from wiring.scanning import register
 
+from .config import Config
+from .executor import Executor
 from .plugin import PluginEngine
 
 
@@ -20,11 +22,19 @@ class Application(dbus.service.Object):
     BUS_INTERFACE = "com.github.Tomate"
     SPEC = "tomate.app"
 
-    @inject(bus="dbus.session", window="tomate.ui.view", plugins="tomate.plugin")
-    def __init__(self, bus, window, plugins: PluginEngine):
+    @inject(
+        bus="dbus.session",
+        window="tomate.ui.view",
+        plugins="tomate.plugin",
+        executor="tomate.executor",
+        config="tomate.config",
+    )
+    def __init__(self, bus, window, plugins: PluginEngine, executor: Executor, config: Config):
         dbus.service.Object.__init__(self, bus, self.BUS_PATH)
         self.state = State.STOPPED
         self._window = window
+        self._executor = executor
+        self._config = config
         plugins.collect()
 
     @dbus.service.method(BUS_INTERFACE, out_signature="b")
@@ -37,7 +47,11 @@ class Application(dbus.service.Object):
             self._window.show()
         else:
             self.state = State.STARTED
+            self._config.watch()
             self._window.run()
+            self._config.unwatch()
+            self._executor.shutdown(wait=False)
+            self._config.flush()
 
         return True
 
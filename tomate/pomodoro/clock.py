@@ -0,0 +1,209 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+from gi.repository import GLib
+from wiring import SingletonScope
+from wiring.scanning import register
+
+logger = logging.getLogger(__name__)
+
+CLOCK_BOOTTIME = getattr(time, "CLOCK_BOOTTIME", time.CLOCK_MONOTONIC)
+
+Callback = Callable[[], bool]
+
+
+class Clock:
+    """
+    Time source and timeout scheduler used by the Timer.
+
+    A callback added with timeout_add runs again after the same interval while it returns True.
+    The monotonic time stops while the system is suspended, the boot time does not.
+    """
+
+    def monotonic(self) -> float:
+        raise NotImplementedError
+
+    def boottime(self) -> float:
+        return self.monotonic()
+
+    def timeout_add(self, seconds: float, callback: Callback) -> int:
+        raise NotImplementedError
+
+    def idle_add(self, callback: Callback) -> int:
+        """
+        Runs the callback when there is nothing more urgent to do, again while it returns True
+        """
+        return self.timeout_add(0, callback)
+
+    def call_soon_threadsafe(self, callback: Callable[[], None]) -> None:
+        """
+        Runs the callback once on the main loop, it is the only method another thread may call
+        """
+        raise NotImplementedError
+
+    def source_remove(self, source: int) -> None:
+        raise NotImplementedError
+
+
+@register.factory("tomate.clock", scope=SingletonScope)
+def create_clock() -> Clock:
+    """
+    The graph picks the backend when it builds the clock, asyncio when it happens inside a running event loop
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return GLibClock()
+
+    logger.debug("action=create_clock backend=asyncio")
+    return AsyncioClock(loop)
+
+
+class GLibClock(Clock):
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def boottime(self) -> float:
+        return time.clock_gettime(CLOCK_BOOTTIME)
+
+    def timeout_add(self, seconds: float, callback: Callback) -> int:
+        return GLib.timeout_add(math.ceil(seconds * 1000), callback, priority=GLib.PRIORITY_HIGH)
+
+    def idle_add(self, callback: Callback) -> int:
+        return GLib.idle_add(callback, priority=GLib.PRIORITY_DEFAULT_IDLE)
+
+    def call_soon_threadsafe(self, callback: Callable[[], None]) -> None:
+        GLib.idle_add(lambda: callback() and False, priority=GLib.PRIORITY_DEFAULT)
+
+    def source_remove(self, source: int) -> None:
+        GLib.source_remove(source)
+
+
+class AsyncioClock(Clock):
+    """
+    Clock for headless services embedding the sessions in an asyncio event loop
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._ids = itertools.count(1)
+        self._handles: Dict[int, asyncio.TimerHandle] = {}
+
+    def monotonic(self) -> float:
+        return self._loop.time()
+
+    def boottime(self) -> float:
+        # the loop time is the monotonic clock, the difference between both still measures a suspend
+        return self._loop.time() + time.clock_gettime(CLOCK_BOOTTIME) - time.monotonic()
+
+    def timeout_add(self, seconds: float, callback: Callback) -> int:
+        source = next(self._ids)
+
+        def run() -> None:
+            if callback() and source in self._handles:
+                self._handles[source] = self._loop.call_later(seconds, run)
+            else:
+                self._handles.pop(source, None)
+
+        self._handles[source] = self._loop.call_later(seconds, run)
+        return source
+
+    def call_soon_threadsafe(self, callback: Callable[[], None]) -> None:
+        self._loop.call_soon_threadsafe(callback)
+
+    def source_remove(self, source: int) -> None:
+        handle = self._handles.pop(source, None)
+        if handle is not None:
+            handle.cancel()
+
+
+class VirtualClock(Clock):
+    """
+    Clock which only moves when asked, running every due callback in order without sleeping.
+    """
+
+    def __init__(self, now: float = 0.0):
+        self._now = now
+        self._suspended = 0.0
+        self._ids = itertools.count(1)
+        self._queue: List[Tuple[float, int]] = []
+        self._sources: Dict[int, Tuple[float, Callback]] = {}
+        # callbacks handed over by other threads, moved to the queue by the next advance
+        self._incoming: deque = deque()
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def boottime(self) -> float:
+        return self._now + self._suspended
+
+    def timeout_add(self, seconds: float, callback: Callback) -> int:
+        source = next(self._ids)
+        self._sources[source] = (seconds, callback)
+        heapq.heappush(self._queue, (self._now + seconds, source))
+        return source
+
+    def call_soon_threadsafe(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._incoming.append(callback)
+
+    def source_remove(self, source: int) -> None:
+        self._sources.pop(source, None)
+
+    def pending(self) -> int:
+        return len(self._sources)
+
+    def stall(self, seconds: float) -> None:
+        """
+        Moves the time forward without running callbacks, like a blocked main loop
+        """
+        self._now += seconds
+
+    def suspend(self, seconds: float) -> None:
+        """
+        Moves only the boot time forward, like a system that slept
+        """
+        self._suspended += seconds
+
+    def advance(self, seconds: float) -> int:
+        return self._run(self._now + seconds)
+
+    def run(self) -> int:
+        return self._run(math.inf)
+
+    def _run(self, until: float) -> int:
+        dispatched = 0
+
+        with self._lock:
+            incoming, self._incoming = self._incoming, deque()
+
+        for callback in incoming:
+            self.timeout_add(0, lambda callback=callback: callback() and False)
+
+        while self._queue and self._queue[0][0] <= until:
+            due, source = heapq.heappop(self._queue)
+            if source not in self._sources:
+                continue
+
+            self._now = max(self._now, due)
+            interval, callback = self._sources[source]
+            dispatched += 1
+
+            if callback() and source in self._sources:
+                heapq.heappush(self._queue, (self._now + interval, source))
+            else:
+                self._sources.pop(source, None)
+
+        if until != math.inf:
+            self._now = max(self._now, until)
+
+        logger.debug("action=run now=%.3f dispatched=%d", self._now, dispatched)
+        return dispatched
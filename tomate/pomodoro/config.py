@@ -1,18 +1,31 @@
+import contextlib
+import hashlib
+import io
 import logging
 import os
+import tempfile
 from collections import namedtuple
-from configparser import RawConfigParser
-from typing import List, Union
+from configparser import Error as ParsingError, RawConfigParser
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union
 
+from gi.repository import Gio
 from wiring import SingletonScope, inject
 from wiring.scanning import register
 from xdg import BaseDirectory, IconTheme
 
+from .clock import Clock
 from .event import Bus, Events
+from .resources import ResourceIndex, remove_duplicates
 
 logger = logging.getLogger(__name__)
 
-Payload = namedtuple("ConfigPayload", "action section option value")
+# a transaction sends one "batch" payload for each section it changed, with the changes of the section
+Payload = namedtuple("ConfigPayload", "action section option value changes", defaults=((),))
+
+WriteStats = namedtuple("WriteStats", ["requested", "written", "saved", "pending"])
+
+_MISSING = object()
 
 
 @register.factory("tomate.config", scope=SingletonScope)
@@ -30,10 +43,29 @@ class Config:
         "long_break_interval": "4",
     }
 
-    @inject(bus="tomate.bus")
-    def __init__(self, bus: Bus, parser=RawConfigParser(defaults=DEFAULTS, strict=True)):
+    # seconds a change waits for the next one before the file is written
+    SAVE_DELAY = 1.0
+    # seconds the file has to stay untouched after a change by another program before it is read again
+    RELOAD_DELAY = 0.2
+
+    @inject(bus="tomate.bus", clock="tomate.clock")
+    def __init__(self, bus: Bus, parser=RawConfigParser(defaults=DEFAULTS, strict=True), clock: Clock = None):
         self.parser = parser
+        # values already read, by the names and the parser method used to read them
+        self._cache: Dict[Tuple[str, str, str], Any] = {}
+        self._cached: Dict[Tuple[str, str], Set[Tuple[str, str, str]]] = {}
         self._bus = bus
+        self._clock = clock
+        self._save_source = None
+        self._requested = self._written = 0
+        # the changes of the running transaction
+        self._changes: Optional[List[Payload]] = None
+        # the content last read or written, tells the changes of other programs from the own writes
+        self._digest: Optional[bytes] = None
+        self._monitor = None
+        self._reload_source = None
+        self._config_path: Optional[str] = None
+        self._index: Optional[ResourceIndex] = None
         self.load()
 
     def __getattr__(self, attr):
@@ -42,45 +74,248 @@ class Config:
     def load(self) -> None:
         logger.debug("action=load uri=%s", self.config_path())
 
-        self.parser.read(self.config_path())
+        path = self.config_path()
+        self.parser.read(path)
+        self._digest = _digest(path)
+        self._forget()
 
     def save(self) -> None:
-        logger.debug("action=write uri=%s", self.config_path())
-
-        with open(self.config_path(), "w") as f:
-            self.parser.write(f)
+        """
+        Writes the file at once, replacing it with a complete new one so a crash never leaves half of it
+        """
+        path = self.config_path()
+        logger.debug("action=write uri=%s", path)
+
+        if self._save_source is not None:
+            self._clock.source_remove(self._save_source)
+            self._save_source = None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix="." + os.path.basename(path))
+        try:
+            if os.path.exists(path):
+                os.chmod(temporary, os.stat(path).st_mode & 0o777)
+
+            content = io.StringIO()
+            self.parser.write(content)
+            data = content.getvalue().encode("utf-8")
+
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+        self._digest = hashlib.sha1(data).digest()
+        self._written += 1
+
+    def watch(self) -> None:
+        """
+        Reloads the file when another program changes it, until unwatch
+        """
+        if self._monitor is not None:
+            return
+
+        logger.debug("action=watch uri=%s", self.config_path())
+        self._monitor = Gio.File.new_for_path(self.config_path()).monitor_file(Gio.FileMonitorFlags.NONE, None)
+        self._monitor.connect("changed", self._on_file_changed)
+
+    def unwatch(self) -> None:
+        if self._monitor is None:
+            return
+
+        self._monitor.cancel()
+        self._monitor = None
+        if self._reload_source is not None:
+            self._clock.source_remove(self._reload_source)
+            self._reload_source = None
+
+    def reload(self) -> bool:
+        """
+        Reads the file again when its content changed, sending Events.CONFIG_CHANGE only for the options whose
+        value changed. The changes still waiting for the save delay win, their write replaces the file.
+        """
+        path = self.config_path()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+
+        digest = hashlib.sha1(data).digest()
+        if digest == self._digest:
+            logger.debug("action=reload uri=%s changed=false", path)
+            return False
+
+        if self._save_source is not None or self._changes is not None:
+            logger.debug("action=reload uri=%s pending=true", path)
+            return False
+
+        try:
+            content = data.decode("utf-8")
+            # checked apart first, a broken file leaves the current values alone
+            RawConfigParser(strict=True).read_string(content, source=path)
+        except (UnicodeDecodeError, ParsingError) as error:
+            logger.warning("action=reload uri=%s error=%s", path, error)
+            return False
+
+        before = self._values()
+        for section in self.parser.sections():
+            self.parser.remove_section(section)
+        self.parser.read_string(content, source=path)
+        self._digest = digest
+        self._forget()
+
+        after = self._values()
+        defaults = self.parser.defaults()
+        changes = [
+            Payload(action="set", section=section, option=option, value=value)
+            for (section, option), value in after.items()
+            if before.get((section, option), _MISSING) != value
+        ]
+        for section, option in before:
+            if (section, option) in after:
+                continue
+            if option in defaults:
+                # back to the default value
+                changes.append(Payload(action="set", section=section, option=option, value=defaults[option]))
+            else:
+                changes.append(Payload(action="remove", section=section, option=option, value=""))
+
+        logger.debug("action=reload uri=%s changes=%d", path, len(changes))
+        self._announce(changes)
+        return True
+
+    def _values(self) -> Dict[Tuple[str, str], str]:
+        # the values of the sections, without the defaults they only inherit
+        defaults = self.parser.defaults()
+        return {
+            (section, option): value
+            for section in self.parser.sections()
+            for option, value in self.parser.items(section, raw=True)
+            if defaults.get(option, _MISSING) != value
+        }
+
+    def _on_file_changed(self, _monitor, _file, _other, event) -> None:
+        if event not in (
+            Gio.FileMonitorEvent.CHANGED,
+            Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+            Gio.FileMonitorEvent.CREATED,
+        ):
+            return
+
+        if self._clock is None:
+            self.reload()
+            return
+
+        # an editor writes in bursts, the file is read once it stays untouched
+        if self._reload_source is not None:
+            self._clock.source_remove(self._reload_source)
+        self._reload_source = self._clock.timeout_add(self.RELOAD_DELAY, self._on_reload_delay)
+
+    def _on_reload_delay(self) -> bool:
+        self._reload_source = None
+        self.reload()
+        return False
+
+    def flush(self) -> None:
+        """
+        Writes the changes still waiting for the save delay, the application calls it on shutdown
+        """
+        if self._save_source is not None:
+            self.save()
+
+    def write_stats(self) -> WriteStats:
+        return WriteStats(
+            requested=self._requested,
+            written=self._written,
+            saved=max(self._requested - self._written - (self._save_source is not None), 0),
+            pending=self._save_source is not None,
+        )
+
+    def _save_later(self) -> None:
+        if self._clock is None:
+            self.save()
+            return
+
+        # debounced, a change moves the write after the last one
+        if self._save_source is not None:
+            self._clock.source_remove(self._save_source)
+        self._save_source = self._clock.timeout_add(self.SAVE_DELAY, self._on_save_delay)
+
+    def _on_save_delay(self) -> bool:
+        self._save_source = None
+        self.save()
+        return False
 
     def config_path(self) -> str:
-        BaseDirectory.save_config_path(self.APP_NAME)
-        return os.path.join(BaseDirectory.xdg_config_home, self.APP_NAME, self.APP_NAME + ".conf")
+        if self._config_path is None:
+            self._config_path = os.path.join(BaseDirectory.save_config_path(self.APP_NAME), self.APP_NAME + ".conf")
+        return self._config_path
 
     def media_uri(self, *resources: str) -> str:
         return "file://" + self._resource_path(self.APP_NAME, "media", *resources)
 
     def plugin_paths(self) -> List[str]:
-        return remove_duplicates(self._load_data_paths(self.APP_NAME, "plugins"))
+        return list(self._data_paths(self.APP_NAME, "plugins"))
 
     def icon_paths(self) -> List[str]:
-        return remove_duplicates(self._load_data_paths("icons"))
+        return list(self._data_paths("icons"))
+
+    def _data_paths(self, *resources: str) -> List[str]:
+        return self.index().lookup(
+            "paths:" + "/".join(resources),
+            lambda: (remove_duplicates(self._load_data_paths(*resources)), self._data_directories(*resources)),
+        )
 
     def _resource_path(self, *resources) -> str:
-        for resource in self._load_data_paths(*resources):
-            if os.path.exists(resource):
-                return resource
+        def resolve():
+            for resource in self._load_data_paths(*resources):
+                if os.path.exists(resource):
+                    return resource, self._data_directories(*resources)
+            return None, self._data_directories(*resources)
+
+        resource = self.index().lookup("resource:" + "/".join(resources), resolve)
+        if resource is not None:
+            return resource
 
         raise EnvironmentError("Resource '%s' not found!" % resources[-1])
 
     def _load_data_paths(self, *resources) -> List[str]:
         return [path for path in BaseDirectory.load_data_paths(*resources)]
 
-    def icon_path(self, iconname, size=None, theme=None) -> str:
-        icon_path = IconTheme.getIconPath(iconname, size, theme, extensions=["png", "svg", "xpm"])
+    @staticmethod
+    def _data_directories(*resources) -> List[str]:
+        # a resource appears or goes away with an entry of the directory holding it
+        return [os.path.dirname(os.path.join(directory, *resources)) for directory in BaseDirectory.xdg_data_dirs]
 
+    def icon_path(self, iconname, size=None, theme=None) -> str:
+        def resolve():
+            path = IconTheme.getIconPath(iconname, size, theme, extensions=["png", "svg", "xpm"])
+            # the theme directories are where an icon theme update shows, as IconTheme checks them itself
+            themes = [
+                os.path.join(directory, name) for directory in IconTheme.icondirs for name in (theme, "hicolor") if name
+            ]
+            return path, IconTheme.icondirs + themes + ([os.path.dirname(path)] if path else [])
+
+        icon_path = self.index().lookup("icon:%s:%s:%s" % (iconname, size, theme), resolve)
         if icon_path is not None:
             return icon_path
 
         raise EnvironmentError("Icon '%s' not found!" % iconname)
 
+    def index(self) -> ResourceIndex:
+        """
+        Icons and resources already resolved, in the XDG cache directory
+        """
+        if self._index is None:
+            path = os.path.join(BaseDirectory.xdg_cache_home, self.APP_NAME, "resources.json")
+            self._index = ResourceIndex(path, scope=BaseDirectory.xdg_data_dirs)
+        return self._index
+
     def get_int(self, section: str, option: str, fallback=None) -> int:
         return self.get(section, option, fallback, method="getint")
 
@@ -88,14 +323,35 @@ class Config:
         return self.get(section, option, fallback, method="getboolean")
 
     def get(self, section: str, option: str, fallback=None, method="get") -> Union[str, int, bool]:
-        section = self.normalize(section)
-        option = self.normalize(option)
-        if not self.parser.has_section(section):
-            self.parser.add_section(section)
+        key = (section, option, method)
+        try:
+            value = self._cache[key]
+        except KeyError:
+            value = self._read(section, option, method)
+
+        return fallback if value is _MISSING else value
+
+    def _read(self, section: str, option: str, method: str) -> Any:
+        names = (self.normalize(section), self.normalize(option))
+        logger.debug("action=read section=%s option=%s method=%s", *names, method)
 
-        logger.debug("action=get section=%s option=%s", section, option)
+        # a section missing from the file still has the defaults, read without adding the section
+        section_in_file = names[0] if self.parser.has_section(names[0]) else self.parser.default_section
+        value = getattr(self.parser, method)(section_in_file, names[1], fallback=_MISSING)
 
-        return getattr(self.parser, method)(section, option, fallback=fallback)
+        key = (section, option, method)
+        self._cache[key] = value
+        self._cached.setdefault(names, set()).add(key)
+        return value
+
+    def _forget(self, section: str = None, option: str = None) -> None:
+        if section is None:
+            self._cache.clear()
+            self._cached.clear()
+            return
+
+        for key in self._cached.pop((section, option), ()):
+            self._cache.pop(key, None)
 
     def set(self, section: str, option: str, value) -> None:
         logger.debug("action=set section=%s option=%s value=%s", section, option, value)
@@ -105,10 +361,7 @@ class Config:
         if not self.parser.has_section(section):
             self.parser.add_section(section)
         self.parser.set(section, option, value)
-        self.save()
-
-        payload = Payload(action="set", section=section, option=option, value=value)
-        self._bus.send(Events.CONFIG_CHANGE, payload=payload)
+        self._changed(Payload(action="set", section=section, option=option, value=value))
 
     def remove(self, section, option) -> None:
         logger.debug("action=remove section=%s option=%s", section, option)
@@ -116,15 +369,117 @@ class Config:
         section = self.normalize(section)
         option = self.normalize(option)
         self.parser.remove_option(section, option)
-        self.save()
-
-        payload = Payload(action="remove", section=section, option=option, value="")
+        self._changed(Payload(action="remove", section=section, option=option, value=""))
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator["Config"]:
+        """
+        Applies the changes made inside the block together: the file is written once and a section gets one
+        Events.CONFIG_CHANGE with all its changes. An error inside the block undoes them.
+        """
+        if self._changes is not None:
+            # joins the transaction already running
+            yield self
+            return
+
+        backup = io.StringIO()
+        self.parser.write(backup)
+        self._changes = []
+
+        try:
+            yield self
+        except BaseException:
+            self._requested -= len(self._changes)
+            self._changes = None
+            self._restore(backup.getvalue())
+            raise
+
+        changes, self._changes = self._changes, None
+        self._commit(changes)
+
+    def _changed(self, payload: Payload) -> None:
+        self._requested += 1
+        self._forget(payload.section, payload.option)
+
+        if self._changes is not None:
+            self._changes.append(payload)
+            return
+
+        self._save_later()
         self._bus.send(Events.CONFIG_CHANGE, payload=payload)
 
+    def _commit(self, changes: List[Payload]) -> None:
+        logger.debug("action=commit changes=%d", len(changes))
+        if not changes:
+            return
+
+        self._save_later()
+        self._announce(changes)
+
+    def _announce(self, changes: List[Payload]) -> None:
+        # the last change of an option wins, the sections keep the order they were first changed in
+        sections: Dict[str, Dict[str, Payload]] = {}
+        for payload in changes:
+            sections.setdefault(payload.section, {}).pop(payload.option, None)
+            sections[payload.section][payload.option] = payload
+
+        for section, options in sections.items():
+            if len(options) == 1:
+                (payload,) = options.values()
+            else:
+                payload = Payload(action="batch", section=section, option="", value="", changes=tuple(options.values()))
+            self._bus.send(Events.CONFIG_CHANGE, payload=payload)
+
+    def _restore(self, state: str) -> None:
+        logger.debug("action=rollback")
+        for section in self.parser.sections():
+            self.parser.remove_section(section)
+        for option in list(self.parser.defaults()):
+            self.parser.remove_option(self.parser.default_section, option)
+
+        self.parser.read_string(state)
+        self._forget()
+
     @staticmethod
     def normalize(name: str) -> str:
         return name.replace(" ", "_").lower()
 
 
-def remove_duplicates(original: List[str]) -> List[str]:
-    return list(set(original))
+class Snapshot:
+    """
+    Read only copy of the timer options which many sessions share instead of each reading the Config.
+    Refreshing replaces the copy as a whole.
+    """
+
+    __slots__ = ("_values",)
+
+    DURATION_SECTION = Config.DURATION_SECTION
+
+    def __init__(self, values: Mapping[Tuple[str, str], int]):
+        self._values = MappingProxyType(dict(values))
+
+    @classmethod
+    def of(cls, config: Config) -> "Snapshot":
+        return cls(cls._read(config))
+
+    def refresh(self, config: Config) -> None:
+        logger.debug("action=refresh_snapshot")
+        self._values = MappingProxyType(self._read(config))
+
+    def get_int(self, section: str, option: str, fallback=None) -> int:
+        return self._values.get((Config.normalize(section), Config.normalize(option)), fallback)
+
+    @staticmethod
+    def _read(config: Config) -> dict:
+        return {
+            (Config.DURATION_SECTION, option): config.get_int(Config.DURATION_SECTION, option)
+            for option in Config.DEFAULTS
+        }
+
+
+def _digest(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).digest()
+    except FileNotFoundError:
+        return None
@@ -1,12 +1,20 @@
+import copy
 import enum
 import functools
+import inspect
 import logging
-from typing import Any, Callable, List, Tuple
+import threading
+import time
+import types
+import weakref
+from collections import deque, namedtuple
+from typing import Any, Callable, Deque, Dict, Hashable, List, Mapping, Optional, Tuple
 
-import blinker
-from wiring import SingletonScope
+from wiring import SingletonScope, inject
 from wiring.scanning import register
 
+from .clock import Clock
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,68 +38,675 @@ class Events(enum.Enum):
     CONFIG_CHANGE = 12
 
 
+@enum.unique
+class Granularity(enum.Enum):
+    """
+    How often a Events.TIMER_UPDATE receiver wants to be called
+    """
+
+    SECOND = 0
+    MINUTE = 1
+    PERCENT = 2
+    COUNTDOWN = 3
+    TICK = 4
+
+    def key(self, payload) -> Any:
+        if self is Granularity.MINUTE:
+            return payload.time_left // 60
+
+        if self is Granularity.PERCENT:
+            return payload.elapsed_percent
+
+        if self is Granularity.COUNTDOWN:
+            return payload.countdown
+
+        return payload.time_left
+
+
+class Lane(enum.IntEnum):
+    """
+    Priority of the queued events, a lower lane is drained first
+    """
+
+    SESSION = 0
+    DEFAULT = 1
+    UI = 2
+
+    @classmethod
+    def of(cls, event: Events) -> "Lane":
+        if event is Events.TIMER_UPDATE:
+            return cls.UI
+
+        if event in (Events.CONFIG_CHANGE, Events.WINDOW_SHOW, Events.WINDOW_HIDE):
+            return cls.DEFAULT
+
+        return cls.SESSION
+
+
+class Policy(enum.Enum):
+    """
+    What the queue does with an event published while an older one of the same type is still waiting
+    """
+
+    KEEP_ALL = 0
+    LATEST = 1
+
+    @classmethod
+    def of(cls, event: Events) -> "Policy":
+        return cls.LATEST if event is Events.TIMER_UPDATE else cls.KEEP_ALL
+
+
+QueueStats = namedtuple(
+    "QueueStats", ["depth", "high_water", "queued", "delivered", "overflows", "wakeups", "coalesced"]
+)
+
 Receiver = Callable[[Events, Any], Any]
+ReceiverKey = Hashable
+
+
+def _receiver_key(receiver: Receiver) -> ReceiverKey:
+    # a bound method is created on every attribute access, its object and function identify it
+    if inspect.ismethod(receiver):
+        return id(receiver.__self__), id(receiver.__func__)
+    return id(receiver)
+
+
+def _receiver_name(receiver: Receiver) -> str:
+    if inspect.ismethod(receiver):
+        return "%s.%s" % (type(receiver.__self__).__qualname__, receiver.__func__.__name__)
+    return getattr(receiver, "__qualname__", type(receiver).__qualname__)
+
+
+class ReceiverStats:
+    """
+    Calls, errors and latency histogram of a receiver of an event.
+    The bucket n counts the calls which took less than 2**n microseconds, the last one everything slower.
+    """
+
+    __slots__ = ("event", "receiver", "calls", "errors", "total", "max", "buckets")
+
+    BUCKETS = 25
+
+    def __init__(self, event: Events, receiver: str):
+        self.event = event
+        self.receiver = receiver
+        self.calls = self.errors = 0
+        self.total = self.max = 0.0
+        self.buckets = [0] * self.BUCKETS
+
+    def record(self, seconds: float) -> None:
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Upper bound, in seconds, of the bucket holding the percentile
+        """
+        rank = self.calls * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank and bucket < self.BUCKETS - 1:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+
+_SKIPPED = object()
+_RESET = object()
+_MISSING = object()
+
+
+def snapshot(payload: Any) -> Any:
+    """
+    Copy of the payload a worker thread can read while the main loop goes on, hashable payloads are immutable
+    """
+    try:
+        hash(payload)
+        return payload
+    except TypeError:
+        return copy.deepcopy(payload)
+
+
+class Subscription:
+    __slots__ = (
+        "key",
+        "name",
+        "granularity",
+        "where",
+        "stats",
+        "_last",
+        "_ref",
+        "_func",
+        "_call",
+        "_with_event",
+        "_submit",
+    )
+
+    def __init__(
+        self,
+        receiver: Receiver,
+        weak: bool,
+        granularity: Optional[Granularity],
+        on_dead,
+        submit=None,
+        where: Mapping[str, Any] = None,
+    ):
+        self.key = _receiver_key(receiver)
+        self.name = _receiver_name(receiver)
+        self.granularity = granularity
+        # (field, value) the payloads must have, sorted by field
+        self.where: Tuple[Tuple[str, Any], ...] = tuple(sorted((where or {}).items(), key=lambda item: item[0]))
+        self.stats: Optional[ReceiverStats] = None
+        self._last = None
+        self._submit = submit
+        self._func = self._call = None
+        self._with_event = True
+
+        if inspect.ismethod(receiver):
+            # keeps the object and its function apart, the bus calls them without creating a bound method
+            self._func = receiver.__func__
+            self._call = getattr(self._func, "_handler", self._func)
+            self._with_event = self._call is self._func
+            target = receiver.__self__
+        else:
+            target = receiver
+
+        if weak:
+            try:
+                self._ref = weakref.ref(target, lambda _: on_dead(self))
+                return
+            except TypeError:
+                pass
+
+        self._ref = lambda: target
+
+    @property
+    def receiver(self) -> Optional[Receiver]:
+        target = self._ref()
+        if target is None or self._func is None:
+            return target
+
+        return types.MethodType(self._func, target)
+
+    def deliver(self, event: Events, payload: Any) -> Any:
+        target = self._ref()
+        if target is None or not self.accepts(payload):
+            return _SKIPPED
+
+        invoke = self._invoke if self.stats is None else self._measure
+
+        if self._submit is not None:
+            return self._submit(invoke, target, event, payload)
+
+        return invoke(target, event, payload)
+
+    def _measure(self, target: Any, event: Events, payload: Any) -> Any:
+        stats = self.stats
+        start = time.perf_counter()
+        try:
+            return self._invoke(target, event, payload)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.record(time.perf_counter() - start)
+
+    def _invoke(self, target: Any, event: Events, payload: Any) -> Any:
+        if self._call is None:
+            return target(event, payload=payload)
+
+        if self._with_event:
+            return self._call(target, event, payload=payload)
+
+        return self._call(target, payload=payload)
+
+    def matches(self, payload: Any) -> bool:
+        return all(getattr(payload, field, _MISSING) == value for field, value in self.where)
+
+    def accepts(self, payload: Any) -> bool:
+        if self.granularity in (None, Granularity.TICK) or payload is None:
+            return True
+
+        key = self.granularity.key(payload)
+        if key == self._last:
+            return False
+
+        self._last = key
+        return True
+
+    def reset(self) -> None:
+        self._last = None
+
+
+class _Index:
+    """
+    Receivers of an event with filters, selected once for each combination of the filtered payload fields
+    """
+
+    __slots__ = ("fields", "_selections")
+
+    SIZE = 64
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self._selections: Dict[Tuple[Any, ...], Tuple[Subscription, ...]] = {}
+
+    def select(self, route: Tuple[Subscription, ...], payload: Any) -> Tuple[Subscription, ...]:
+        key = tuple(getattr(payload, field, _MISSING) for field in self.fields)
+        try:
+            return self._selections[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # an unhashable value, selected without keeping the selection
+            return tuple(subscription for subscription in route if subscription.matches(payload))
+
+        if len(self._selections) >= self.SIZE:
+            self._selections.clear()
+
+        selection = self._selections[key] = tuple(
+            subscription for subscription in route if subscription.matches(payload)
+        )
+        return selection
 
 
 @register.factory("tomate.bus", scope=SingletonScope)
 class Bus:
-    def __init__(self):
-        self._bus = blinker.NamedSignal("tomate")
+    QUEUE_SIZE = 1024
+
+    @inject(loop="tomate.clock")
+    def __init__(self, loop: Clock = None):
+        self._loop = loop
+        self._posted: Deque[Tuple[Events, Any, Optional[Granularity]]] = deque()
+        self._post_lock = threading.Lock()
+        self._wakeup_pending = False
+        self._wakeups = 0
+        self._subscriptions: Dict[Events, Dict[ReceiverKey, Subscription]] = {}
+        # snapshot of the subscriptions of each event, rebuilt after a connect or a disconnect
+        self._routes: Dict[Events, Tuple[Subscription, ...]] = {}
+        # built with the route of the events which have receivers with filters
+        self._indexes: Dict[Events, _Index] = {}
+        self._clock = None
+        self._drain_source = None
+        self._queue_size = Bus.QUEUE_SIZE
+        self._lanes: Tuple[Deque[Tuple[Events, Any, Optional[Granularity]]], ...] = tuple(deque() for _ in Lane)
+        self._executors: Dict[str, Any] = {}
+        self._policies: Dict[Events, Policy] = {event: Policy.of(event) for event in Events}
+        self._high_water = self._queued = self._delivered = self._overflows = self._coalesced = 0
+        self._measuring = False
+        # called with every delivered event, before its receivers
+        self._taps: Tuple[Callable[[Events, Any, Optional[Granularity]], Any], ...] = ()
+        self._stats: Dict[Tuple[Events, str], ReceiverStats] = {}
 
-    def connect(self, event: Events, receiver: Receiver, weak: bool = True):
-        self._bus.connect(receiver, sender=event, weak=weak)
+    def connect(
+        self,
+        event: Events,
+        receiver: Receiver,
+        weak: bool = True,
+        granularity: Granularity = None,
+        executor: str = None,
+        where: Mapping[str, Any] = None,
+    ):
+        """
+        The receiver is only called with the payloads which have the values of where, the receivers with filters
+        are indexed by the filtered fields
+        """
+        # connecting again replaces the subscription, in place, with the new options
+        submit = functools.partial(self._submit, executor) if executor is not None else None
+        subscription = Subscription(receiver, weak, granularity, functools.partial(self._discard, event), submit, where)
+        if self._measuring:
+            self._attach_stats(event, subscription)
+        self._subscriptions.setdefault(event, {})[subscription.key] = subscription
+        self._invalidate(event)
 
     def is_connect(self, event: Events, receiver: Receiver) -> bool:
-        return receiver in self._bus.receivers_for(event)
+        return self._lookup(event, receiver) is not None
+
+    def has_receivers(self, event: Events) -> bool:
+        return any(subscription.receiver is not None for subscription in self._route(event))
+
+    def send(self, event: Events, payload: Any = None, granularity: Granularity = None) -> List[Any]:
+        """
+        Calls the receivers of the event, only the ones with the given granularity when there is one
+        """
+        results = []
+
+        for tap in self._taps:
+            tap(event, payload, granularity)
+
+        for subscription in self._select(event, payload):
+            if granularity is not None and subscription.granularity is not granularity:
+                continue
+
+            result = subscription.deliver(event, payload)
+            if result is not _SKIPPED:
+                results.append(result)
+
+        return results
+
+    def publish(self, event: Events, payload: Any = None, granularity: Granularity = None) -> None:
+        """
+        Same as send for the callers which do not need the results, queued when the queue is enabled
+        """
+        if self._clock is not None:
+            self._enqueue(event, payload, granularity)
+        else:
+            self._dispatch(event, payload, granularity)
+
+    def post(self, event: Events, payload: Any = None, granularity: Granularity = None) -> None:
+        """
+        Publishes the event on the main loop, the only method other threads may call.
+        A burst of posts wakes the main loop up once, the events keep the order they were posted in.
+        """
+        if self._loop is None:
+            raise RuntimeError("Bus.post needs the bus to be created with the main loop clock")
+
+        with self._post_lock:
+            self._posted.append((event, payload, granularity))
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+            self._wakeups += 1
+
+        self._loop.call_soon_threadsafe(self._on_posted)
+
+    def enable_queue(self, clock: Clock, size: int = QUEUE_SIZE) -> None:
+        """
+        Queues the published events and delivers them when the main loop is idle, the session events first.
+        The events of a type keep their order, a waiting Events.TIMER_UPDATE is replaced by a newer one (see Policy).
+        A full queue is drained by the publisher.
+        """
+        logger.debug("action=enable_queue size=%d", size)
+        self._clock = clock
+        self._queue_size = size
+
+    def disable_queue(self) -> None:
+        logger.debug("action=disable_queue")
+        if self._drain_source is not None:
+            self._clock.source_remove(self._drain_source)
+            self._drain_source = None
+
+        self._drain(sum(len(lane) for lane in self._lanes))
+        self._clock = None
+
+    def queue_stats(self) -> QueueStats:
+        return QueueStats(
+            depth={lane: len(self._lanes[lane]) for lane in Lane},
+            high_water=self._high_water,
+            queued=self._queued,
+            delivered=self._delivered,
+            overflows=self._overflows,
+            wakeups=self._wakeups,
+            coalesced=self._coalesced,
+        )
 
-    def send(self, event: Events, payload: Any = None) -> List[Any]:
-        # ignore the receiver in the result
-        return [result[1] for result in self._bus.send(event, payload=payload)]
+    def enable_stats(self) -> None:
+        """
+        Measures the calls of every receiver, the stats collected before are kept
+        """
+        logger.debug("action=enable_stats")
+        self._measuring = True
+
+        for event, subscriptions in self._subscriptions.items():
+            for subscription in subscriptions.values():
+                self._attach_stats(event, subscription)
+
+    def disable_stats(self) -> None:
+        logger.debug("action=disable_stats")
+        self._measuring = False
+
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions.values():
+                subscription.stats = None
+
+    def stats(self) -> List[ReceiverStats]:
+        """
+        Stats of the receivers measured since the instrumentation was enabled, the slowest in total first
+        """
+        return sorted(self._stats.values(), key=lambda stats: stats.total, reverse=True)
+
+    def stats_report(self) -> str:
+        row = "{:<16} {:<48} {:>8} {:>6} {:>10} {:>10} {:>10}".format
+        lines = [row("event", "receiver", "calls", "errors", "mean(us)", "p99(us)", "max(us)")]
+
+        for stats in self.stats():
+            latencies = ("%.1f" % (seconds * 1e6) for seconds in (stats.mean, stats.percentile(99), stats.max))
+            lines.append(row(stats.event.name, stats.receiver, stats.calls, stats.errors, *latencies))
+
+        return "\n".join(lines)
+
+    def set_policy(self, event: Events, policy: Policy) -> None:
+        if policy is Policy.LATEST and Lane.of(event) is Lane.SESSION:
+            raise ValueError("%s can not be dropped" % event)
+
+        self._policies[event] = policy
+
+    def add_tap(self, tap: Callable[[Events, Any, Optional[Granularity]], Any]) -> None:
+        """
+        Calls the tap with every event the bus delivers, the journal records them this way
+        """
+        self._taps += (tap,)
+
+    def remove_tap(self, tap: Callable[[Events, Any, Optional[Granularity]], Any]) -> None:
+        self._taps = tuple(other for other in self._taps if other != tap)
+
+    def set_executor(self, name: str, executor) -> None:
+        """
+        Runs the receivers connected with this executor name through executor.submit
+        """
+        self._executors[name] = executor
+
+    def reset(self, event: Events) -> None:
+        """
+        Forgets the last payload the receivers with a granularity accepted, the next one reaches all of them
+        """
+        if self._lanes[Lane.of(event)]:
+            # the queued events of the previous countdown still have to see the old keys
+            self._lanes[Lane.of(event)].append((event, _RESET, None))
+        else:
+            self._reset(event)
 
     def disconnect(self, event: Events, receiver: Receiver):
-        self._bus.disconnect(receiver, sender=event)
+        subscription = self._lookup(event, receiver)
+        if subscription is not None:
+            self._discard(event, subscription)
+
+    def _reset(self, event: Events) -> None:
+        for subscription in self._route(event):
+            subscription.reset()
+
+    def _attach_stats(self, event: Events, subscription: Subscription) -> None:
+        # a receiver connected again, or another instance of its class, adds to the same stats
+        key = (event, subscription.name)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ReceiverStats(event, subscription.name)
+        subscription.stats = stats
+
+    def _on_posted(self) -> None:
+        with self._post_lock:
+            posted, self._posted = self._posted, deque()
+            self._wakeup_pending = False
 
+        logger.debug("action=posted count=%d", len(posted))
+        for event, payload, granularity in posted:
+            self.publish(event, payload, granularity)
+
+    def _enqueue(self, event: Events, payload: Any, granularity: Optional[Granularity]) -> None:
+        depth = sum(len(lane) for lane in self._lanes)
+        if depth >= self._queue_size:
+            # back pressure, the publisher pays for the backlog instead of an event being lost
+            self._overflows += 1
+            self._drain(depth)
+            depth = 0
+
+        lane = self._lanes[Lane.of(event)]
+        if self._policies[event] is Policy.LATEST:
+            # the waiting payloads the new one supersedes are the newest of the lane, a reset marker stops the search
+            while lane and lane[-1][0] is event and lane[-1][1] is not _RESET and granularity in (None, lane[-1][2]):
+                lane.pop()
+                depth -= 1
+                self._coalesced += 1
+
+        lane.append((event, payload, granularity))
+        self._queued += 1
+        self._high_water = max(self._high_water, depth + 1)
+
+        if self._drain_source is None:
+            self._drain_source = self._clock.idle_add(self._on_idle)
+
+    def _on_idle(self) -> bool:
+        # only the events queued so far, the ones their receivers publish wait for the next idle call
+        self._drain(sum(len(lane) for lane in self._lanes))
+
+        if any(self._lanes):
+            return True
+
+        self._drain_source = None
+        return False
+
+    def _drain(self, count: int) -> None:
+        for _ in range(count):
+            lane = next((lane for lane in self._lanes if lane), None)
+            if lane is None:
+                return
+
+            event, payload, granularity = lane.popleft()
+            if payload is _RESET:
+                self._reset(event)
+            else:
+                self._delivered += 1
+                self._dispatch(event, payload, granularity)
+
+    def _dispatch(self, event: Events, payload: Any, granularity: Optional[Granularity]) -> None:
+        for tap in self._taps:
+            tap(event, payload, granularity)
+
+        if granularity is None:
+            for subscription in self._select(event, payload):
+                subscription.deliver(event, payload)
+        else:
+            for subscription in self._select(event, payload):
+                if subscription.granularity is granularity:
+                    subscription.deliver(event, payload)
+
+    def _submit(self, name: str, invoke: Callable, target: Any, event: Events, payload: Any) -> Any:
+        executor = self._executors.get(name)
+        if executor is None:
+            logger.debug("action=submit executor=%s missing=true", name)
+            return invoke(target, event, payload)
+
+        return executor.submit(invoke, target, event, snapshot(payload))
+
+    def _route(self, event: Events) -> Tuple[Subscription, ...]:
+        route = self._routes.get(event)
+        if route is None:
+            route = self._routes[event] = tuple(self._subscriptions.get(event, {}).values())
+            fields = sorted({field for subscription in route for field, _ in subscription.where})
+            if fields:
+                self._indexes[event] = _Index(tuple(fields))
+        return route
+
+    def _select(self, event: Events, payload: Any) -> Tuple[Subscription, ...]:
+        route = self._route(event)
+        index = self._indexes.get(event)
+        return route if index is None else index.select(route, payload)
+
+    def _invalidate(self, event: Events) -> None:
+        self._routes.pop(event, None)
+        self._indexes.pop(event, None)
+
+    def _lookup(self, event: Events, receiver: Receiver) -> Optional[Subscription]:
+        subscription = self._subscriptions.get(event, {}).get(_receiver_key(receiver))
+        if subscription is not None and subscription.receiver == receiver:
+            return subscription
+
+        return None
+
+    def _discard(self, event: Events, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(event, {})
+        if subscriptions.get(subscription.key) is subscription:
+            del subscriptions[subscription.key]
+            self._invalidate(event)
+
+
+def on(*events: Events, granularity: Granularity = None, executor: str = None, where: Mapping[str, Any] = None):
+    if granularity is not None and Events.TIMER_UPDATE not in events:
+        raise ValueError("granularity only applies to Events.TIMER_UPDATE")
 
-def on(*events: Events):
     def wrapper(method):
         method._events = events
+        method._granularity = granularity
+        method._executor = executor
+        method._where = where
 
         @functools.wraps(method)
         def wrapped(*args, **kwargs):
-            # ignore the event type, Events, in the receiver callback
+            # ignore the event type, Events, when the method is called directly, the bus calls _handler
             return method(*(arg for arg in args if not isinstance(arg, Events)), **kwargs)
 
+        wrapped._handler = method
+
         return wrapped
 
     return wrapper
 
 
 class Subscriber:
+    """
+    Connects the methods decorated with @on to a bus, the class collects them once when it is created
+    """
+
+    __slots__ = ()
+
+    # (attribute, events, granularity, executor, where) of every @on method, sorted by attribute
+    _handlers: Tuple[
+        Tuple[str, Tuple[Events, ...], Optional[Granularity], Optional[str], Optional[Mapping[str, Any]]], ...
+    ] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        handlers = {}
+        for klass in reversed(cls.__mro__):
+            for attr, value in vars(klass).items():
+                # reads the class namespace, a property is never evaluated
+                events = getattr(value, "_events", None)
+                if events is None:
+                    handlers.pop(attr, None)
+                else:
+                    handlers[attr] = (
+                        attr,
+                        events,
+                        getattr(value, "_granularity", None),
+                        getattr(value, "_executor", None),
+                        getattr(value, "_where", None),
+                    )
+
+        cls._handlers = tuple(handlers[attr] for attr in sorted(handlers))
+
     def connect(self, bus: Bus) -> None:
-        for method, events in self.__methods_with_events():
+        for attr, events, granularity, executor, where in self._handlers:
+            method = getattr(self, attr)
             for event in events:
-                logger.debug(
-                    "action=connect event=%s method=%s.%s",
+                logger.debug("action=connect event=%s method=%s.%s", event, self.__class__.__name__, attr)
+                bus.connect(
                     event,
-                    self.__class__.__name__,
-                    method.__name__,
+                    method,
+                    granularity=granularity if event is Events.TIMER_UPDATE else None,
+                    executor=executor,
+                    where=where,
                 )
-                bus.connect(event, method)
 
     def disconnect(self, bus: Bus):
-        for method, events in self.__methods_with_events():
+        for attr, events, *_ in self._handlers:
+            method = getattr(self, attr)
             for event in events:
-                logger.debug(
-                    "action=disconnect event=%s method=%s.%s",
-                    event,
-                    self.__class__.__name__,
-                    method.__name__,
-                )
+                logger.debug("action=disconnect event=%s method=%s.%s", event, self.__class__.__name__, attr)
                 bus.disconnect(event, method)
-
-    def __methods_with_events(self) -> List[Tuple[Any, List[Events]]]:
-        return [
-            (getattr(self, attr), getattr(getattr(self, attr), "_events"))
-            for attr in dir(self)
-            if hasattr(getattr(self, attr), "_events")
-        ]
@@ -0,0 +1,46 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from wiring import SingletonScope, inject
+from wiring.scanning import register
+
+from .clock import Clock
+from .event import Bus
+
+logger = logging.getLogger(__name__)
+
+
+@register.factory("tomate.executor", scope=SingletonScope)
+class Executor:
+    """
+    Shared pool of worker threads for the receivers connected with @on(..., executor="background").
+
+    A receiver running on a worker must not touch the UI, call_soon hands that work back to the main loop.
+    """
+
+    BACKGROUND = "background"
+    WORKERS = 4
+
+    @inject(bus="tomate.bus", clock="tomate.clock")
+    def __init__(self, bus: Bus, clock: Clock, workers: int = WORKERS):
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tomate-" + Executor.BACKGROUND)
+        bus.set_executor(Executor.BACKGROUND, self)
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(self._log_error)
+        return future
+
+    def call_soon(self, fn: Callable[..., Any], *args) -> None:
+        self._clock.call_soon_threadsafe(lambda: fn(*args))
+
+    def shutdown(self, wait: bool = True) -> None:
+        logger.debug("action=shutdown wait=%s", wait)
+        self._pool.shutdown(wait=wait)
+
+    @staticmethod
+    def _log_error(future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("action=background_receiver error=%r", future.exception(), exc_info=future.exception())
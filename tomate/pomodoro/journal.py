@@ -0,0 +1,177 @@
+import logging
+import struct
+import uuid
+from collections import namedtuple
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from .clock import Clock
+from .config import Payload as ConfigPayload
+from .event import Bus, Events, Granularity
+from .session import Payload as SessionPayload, Type as SessionType
+from .timer import Payload as TimerPayload
+
+logger = logging.getLogger(__name__)
+
+Record = namedtuple("Record", ["time", "event", "payload", "granularity"])
+
+MAGIC = b"TMJ\x01"
+
+# every record is its length followed by the header and the payload of the kind in the header
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<dBBB")
+TIMER = struct.Struct("<qqd?d")
+SESSION = struct.Struct("<16sBqq")
+CONFIG = struct.Struct("<HHHH")
+CHANGES = struct.Struct("<H")
+
+NONE, TIMER_KIND, SESSION_KIND, CONFIG_KIND, UNKNOWN = range(5)
+NO_GRANULARITY = 0xFF
+
+
+def encode(time: float, event: Events, payload: Any, granularity: Optional[Granularity]) -> bytes:
+    if payload is None:
+        kind, body = NONE, b""
+    elif isinstance(payload, TimerPayload):
+        remaining = payload.remaining
+        kind = TIMER_KIND
+        body = TIMER.pack(payload.time_left, payload.duration, payload.skew, remaining is not None, remaining or 0.0)
+    elif isinstance(payload, SessionPayload):
+        kind = SESSION_KIND
+        body = SESSION.pack(payload.id.bytes, payload.type.value, payload.pomodoros, payload.duration)
+    elif isinstance(payload, ConfigPayload):
+        kind = CONFIG_KIND
+        # the changes of a transaction follow the payload, as config payloads without changes
+        body = b"".join(
+            [_encode_config(payload), CHANGES.pack(len(payload.changes))]
+            + [_encode_config(change) for change in payload.changes]
+        )
+    else:
+        # only the payloads of the Events are known, the event itself is still worth recording
+        kind, body = UNKNOWN, b""
+
+    granularity = NO_GRANULARITY if granularity is None else granularity.value
+    record = HEADER.pack(time, event.value, granularity, kind) + body
+    return LENGTH.pack(len(record)) + record
+
+
+def decode(record: bytes) -> Record:
+    time, event, granularity, kind = HEADER.unpack_from(record)
+    body = memoryview(record)[HEADER.size :]
+
+    if kind == TIMER_KIND:
+        time_left, duration, skew, has_remaining, remaining = TIMER.unpack(body)
+        payload = TimerPayload(time_left, duration, skew, remaining if has_remaining else None)
+    elif kind == SESSION_KIND:
+        identifier, session_type, pomodoros, duration = SESSION.unpack(body)
+        payload = SessionPayload(uuid.UUID(bytes=identifier), SessionType(session_type), pomodoros, duration)
+    elif kind == CONFIG_KIND:
+        fields, offset = _decode_config(body, 0)
+        (count,) = CHANGES.unpack_from(body, offset)
+        offset += CHANGES.size
+
+        changes = []
+        for _ in range(count):
+            change, offset = _decode_config(body, offset)
+            changes.append(ConfigPayload(*change))
+
+        payload = ConfigPayload(*fields, changes=tuple(changes))
+    else:
+        payload = None
+
+    return Record(time, Events(event), payload, None if granularity == NO_GRANULARITY else Granularity(granularity))
+
+
+def _encode_config(payload: ConfigPayload) -> bytes:
+    fields = [str(field).encode("utf-8") for field in payload[:4]]
+    return CONFIG.pack(*(len(field) for field in fields)) + b"".join(fields)
+
+
+def _decode_config(body: memoryview, offset: int) -> Tuple[List[str], int]:
+    lengths = CONFIG.unpack_from(body, offset)
+    fields, offset = [], offset + CONFIG.size
+
+    for length in lengths:
+        fields.append(str(body[offset : offset + length], "utf-8"))
+        offset += length
+
+    return fields, offset
+
+
+class Journal:
+    """
+    Append-only binary file with the events a bus delivered, read it with read and feed it back with replay
+    """
+
+    def __init__(self, path: str, clock: Clock):
+        self._clock = clock
+        self._file: BinaryIO = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self.records = 0
+
+    def attach(self, bus: Bus) -> None:
+        bus.add_tap(self.record)
+
+    def detach(self, bus: Bus) -> None:
+        bus.remove_tap(self.record)
+
+    def record(self, event: Events, payload: Any = None, granularity: Granularity = None) -> None:
+        self._file.write(encode(self._clock.monotonic(), event, payload, granularity))
+        self.records += 1
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        logger.debug("action=close records=%d", self.records)
+        self._file.close()
+
+
+def read(path: str) -> Iterator[Record]:
+    with open(path, "rb") as journal:
+        if journal.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not an event journal" % path)
+
+        while True:
+            prefix = journal.read(LENGTH.size)
+            if not prefix:
+                return
+
+            if len(prefix) == LENGTH.size:
+                (length,) = LENGTH.unpack(prefix)
+                record = journal.read(length)
+                if len(record) == length:
+                    yield decode(record)
+                    continue
+
+            # the process died while writing the last record
+            logger.warning("action=read path=%s truncated=true", path)
+            return
+
+
+def replay(records: Iterable[Record], bus: Bus, clock: Clock = None) -> int:
+    """
+    Sends the records to the bus, one after the other or, with a clock, as far apart as they were recorded
+    """
+    if clock is None:
+        count = 0
+        for record in records:
+            bus.send(record.event, payload=record.payload, granularity=record.granularity)
+            count += 1
+        return count
+
+    records = list(records)
+    if records:
+        start = records[0].time
+        for record in records:
+            clock.timeout_add(record.time - start, _sender(bus, record))
+
+    return len(records)
+
+
+def _sender(bus: Bus, record: Record):
+    def send() -> bool:
+        bus.send(record.event, payload=record.payload, granularity=record.granularity)
+        return False
+
+    return send
@@ -0,0 +1,53 @@
+from typing import Any, Dict, Iterator, Tuple
+
+# sets a slot of an Immutable, for its __init__ and the derived values it keeps
+assign = object.__setattr__
+
+
+class Immutable:
+    """
+    Read only record with slots, it compares, hashes and copies like the namedtuple the payloads used to be.
+
+    The subclasses list their fields in _fields and may keep derived values in extra slots, filled on first use.
+    """
+
+    __slots__ = ()
+
+    _fields: Tuple[str, ...] = ()
+    # name shown by repr, the one of the namedtuple
+    _typename = ""
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("%s is read only" % type(self).__name__)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("%s is read only" % type(self).__name__)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (getattr(self, field) for field in self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        values = ", ".join("%s=%r" % (field, getattr(self, field)) for field in self._fields)
+        return "%s(%s)" % (self._typename or type(self).__name__, values)
+
+    def __reduce__(self):
+        return type(self), tuple(self)
+
+    def _asdict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self._fields}
+
+    def _replace(self, **changes) -> "Immutable":
+        values = self._asdict()
+        values.update(changes)
+        return type(self)(**values)
@@ -0,0 +1,72 @@
+import logging
+from collections import namedtuple
+from typing import Dict, Hashable
+
+from wiring import SingletonScope, inject
+from wiring.scanning import register
+
+from .clock import Clock
+from .config import Config, Payload as ConfigPayload, Snapshot
+from .event import Bus, Events, Subscriber, on
+from .scheduler import WheelScheduler
+from .session import Session
+from .timer import Timer
+
+logger = logging.getLogger(__name__)
+
+Tenant = namedtuple("Tenant", ["bus", "session", "timer"])
+
+
+@register.factory("tomate.registry", scope=SingletonScope)
+class SessionRegistry(Subscriber):
+    """
+    Hosts many independent sessions in one process, each one with its own bus and timer.
+
+    The timers share a WheelScheduler and the sessions share a config Snapshot, so a session only costs its state.
+    """
+
+    @inject(bus="tomate.bus", config="tomate.config", clock="tomate.clock")
+    def __init__(self, bus: Bus, config: Config, clock: Clock):
+        self._config = config
+        self._snapshot = Snapshot.of(config)
+        self._scheduler = WheelScheduler(clock)
+        self._tenants: Dict[Hashable, Tenant] = {}
+        self.connect(bus)
+
+    def create(self, key: Hashable) -> Tenant:
+        if key in self._tenants:
+            raise ValueError("Session '%s' already exists!" % (key,))
+
+        logger.debug("action=create key=%s", key)
+
+        bus = Bus(self._scheduler.clock)
+        timer = Timer(bus, self._scheduler)
+        session = Session(bus, self._snapshot, timer)
+        session.ready()
+
+        tenant = self._tenants[key] = Tenant(bus=bus, session=session, timer=timer)
+        return tenant
+
+    def get(self, key: Hashable) -> Tenant:
+        return self._tenants[key]
+
+    def remove(self, key: Hashable) -> None:
+        logger.debug("action=remove key=%s", key)
+
+        tenant = self._tenants.pop(key)
+        tenant.timer.stop()
+        tenant.session.disconnect(tenant.bus)
+        tenant.timer.disconnect(tenant.bus)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tenants
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    @on(Events.CONFIG_CHANGE, where={"section": Config.DURATION_SECTION})
+    def _on_config_change(self, payload: ConfigPayload) -> None:
+        self._snapshot.refresh(self._config)
+
+        for tenant in self._tenants.values():
+            tenant.bus.send(Events.CONFIG_CHANGE, payload=payload)
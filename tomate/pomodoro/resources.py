@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Resolve = Callable[[], Tuple[Any, Iterable[str]]]
+
+
+class ResourceIndex:
+    """
+    Paths already resolved in the XDG directories, kept in a file between runs.
+
+    An entry keeps the modification times of the directories its value depends on and is resolved again when
+    one of them changed. Each entry is checked on its first lookup of the run, the next ones are dictionary hits.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, scope: Sequence[str] = ()):
+        self.path = path
+        # the search directories the entries were resolved in, the file is dropped when they are not the same
+        self._scope = list(scope)
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+        self._values: Dict[str, Any] = {}
+        self.hits = self.misses = 0
+
+    def lookup(self, key: str, resolve: Resolve) -> Any:
+        """
+        Returns the value of the key, resolve returns the value and the directories it depends on
+        """
+        try:
+            value = self._values[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return value
+
+        entry = self._entries.get(key)
+        if entry is not None and all(_mtime(directory) == mtime for directory, mtime in entry["directories"]):
+            self.hits += 1
+            value = entry["value"]
+        else:
+            self.misses += 1
+            value, directories = resolve()
+            logger.debug("action=resolve key=%s value=%s", key, value)
+            self._entries[key] = {
+                "value": value,
+                "directories": [[directory, _mtime(directory)] for directory in remove_duplicates(directories)],
+            }
+            self._save()
+
+        self._values[key] = value
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._values.clear()
+        self._save()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as error:
+            logger.warning("action=load_index uri=%s error=%s", self.path, error)
+            return {}
+
+        if not isinstance(index, dict) or index.get("version") != self.VERSION or index.get("scope") != self._scope:
+            logger.debug("action=load_index uri=%s stale=true", self.path)
+            return {}
+
+        return index.get("entries", {})
+
+    def _save(self) -> None:
+        # the index only saves work, a cache directory which cannot be written leaves it in memory
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".resources")
+            with os.fdopen(descriptor, "w") as f:
+                json.dump({"version": self.VERSION, "scope": self._scope, "entries": self._entries}, f)
+            os.replace(temporary, self.path)
+        except OSError as error:
+            logger.warning("action=save_index uri=%s error=%s", self.path, error)
+
+
+def _mtime(directory: str) -> Optional[int]:
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def remove_duplicates(original: Iterable[str]) -> List[str]:
+    """
+    Keeps the first of each value, in the order they came
+    """
+    return list(dict.fromkeys(original))
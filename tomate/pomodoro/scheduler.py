@@ -0,0 +1,163 @@
+import logging
+import math
+from typing import Any, Callable, Dict, Hashable, List
+
+from wiring import SingletonScope, inject
+from wiring.scanning import register
+
+from .clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+@register.factory("tomate.scheduler", scope=SingletonScope)
+class Scheduler:
+    """
+    Owns the clock sources, an owner has at most one pending callback and scheduling again replaces it.
+    """
+
+    @inject(clock="tomate.clock")
+    def __init__(self, clock: Clock):
+        self.clock = clock
+        self._sources: Dict[Hashable, int] = {}
+
+    def schedule(self, owner: Hashable, seconds: float, callback: Callable[[], Any]) -> None:
+        self.cancel(owner)
+
+        def run() -> bool:
+            del self._sources[owner]
+            callback()
+            return False
+
+        self._sources[owner] = self.clock.timeout_add(seconds, run)
+
+    def cancel(self, owner: Hashable) -> bool:
+        source = self._sources.pop(owner, None)
+        if source is None:
+            return False
+
+        logger.debug("action=cancel owner=%s source=%d", owner, source)
+        self.clock.source_remove(source)
+        return True
+
+    def is_scheduled(self, owner: Hashable) -> bool:
+        return owner in self._sources
+
+    def live(self) -> int:
+        return len(self._sources)
+
+
+class _Entry:
+    __slots__ = ("owner", "due", "callback", "slot")
+
+    def __init__(self, owner: Hashable, due: int, callback: Callable[[], Any]):
+        self.owner = owner
+        self.due = due
+        self.callback = callback
+        self.slot: Dict[Hashable, "_Entry"] = {}
+
+
+class WheelScheduler:
+    """
+    Scheduler for many owners driven by a single periodic clock source, a hierarchical timing wheel.
+
+    Time is cut in ticks of the given resolution, callbacks run on the first tick at or after their due time.
+    The first level has one slot per tick, every other level has slots as wide as the whole level below and
+    its entries move down when the lower level wraps. Scheduling and cancelling only touch one slot.
+    """
+
+    BITS = 6
+    SLOTS = 1 << BITS
+    MASK = SLOTS - 1
+    LEVELS = 4
+    RESOLUTION = 0.01
+
+    def __init__(self, clock: Clock, resolution: float = RESOLUTION):
+        self.clock = clock
+        self.resolution = resolution
+        self._origin = clock.monotonic()
+        self._current = 0
+        self._source = None
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._wheels = [[{} for _ in range(self.SLOTS)] for _ in range(self.LEVELS)]
+
+    def schedule(self, owner: Hashable, seconds: float, callback: Callable[[], Any]) -> None:
+        self.cancel(owner)
+
+        if self._source is None:
+            # the wheel is empty and idle, it jumps to now instead of replaying the ticks it slept through
+            self._current = self._tick_at(self.clock.monotonic())
+            self._source = self.clock.timeout_add(self.resolution, self._run)
+
+        due = math.ceil(round((self.clock.monotonic() + seconds - self._origin) / self.resolution, 6))
+        entry = _Entry(owner, max(due, self._current + 1), callback)
+        self._entries[owner] = entry
+        self._place(entry)
+
+    def cancel(self, owner: Hashable) -> bool:
+        entry = self._entries.pop(owner, None)
+        if entry is None:
+            return False
+
+        del entry.slot[owner]
+        return True
+
+    def is_scheduled(self, owner: Hashable) -> bool:
+        return owner in self._entries
+
+    def live(self) -> int:
+        return len(self._entries)
+
+    def _tick_at(self, now: float) -> int:
+        return math.floor(round((now - self._origin) / self.resolution, 6))
+
+    def _place(self, entry: _Entry) -> None:
+        delta = entry.due - self._current
+
+        for level in range(self.LEVELS):
+            if delta < 1 << (self.BITS * (level + 1)) or level == self.LEVELS - 1:
+                break
+
+        # further than the last level reaches, parks in its farthest slot and is placed again when cascaded
+        due = min(entry.due, self._current + (1 << (self.BITS * self.LEVELS)) - 1)
+        entry.slot = self._wheels[level][(due >> (self.BITS * level)) & self.MASK]
+        entry.slot[entry.owner] = entry
+
+    def _run(self) -> bool:
+        target = self._tick_at(self.clock.monotonic())
+        dispatched = 0
+
+        while self._current < target and self._entries:
+            for entry in self._advance():
+                # an earlier callback of the same tick may have cancelled or replaced it
+                if self._entries.get(entry.owner) is not entry:
+                    continue
+
+                del self._entries[entry.owner]
+                dispatched += 1
+                entry.callback()
+
+        self._current = max(self._current, target)
+        logger.debug("action=run tick=%d dispatched=%d live=%d", self._current, dispatched, len(self._entries))
+
+        if self._entries:
+            return True
+
+        self._source = None
+        return False
+
+    def _advance(self) -> List[_Entry]:
+        self._current += 1
+        tick = self._current
+
+        # the upper levels move down first, their entries may land in the slots cascaded next
+        for level in reversed(range(1, self.LEVELS)):
+            if tick & ((1 << (self.BITS * level)) - 1) == 0:
+                index = (tick >> (self.BITS * level)) & self.MASK
+                slot, self._wheels[level][index] = self._wheels[level][index], {}
+                for entry in slot.values():
+                    self._place(entry)
+
+        index = tick & self.MASK
+        expired, self._wheels[0][index] = self._wheels[0][index], {}
+        return list(expired.values())
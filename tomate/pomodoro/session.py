@@ -3,23 +3,48 @@ from __future__ import annotations
 import enum
 import logging
 import uuid
-from collections import namedtuple
 
 from wiring import SingletonScope, inject
 from wiring.scanning import register
 
 from .event import Bus, Events, Subscriber, on
 from .fsm import fsm
+from .payload import Immutable, assign
 from .timer import Payload as TimerPayload, SECONDS_IN_A_MINUTE, Timer, format_seconds
 from .config import Config, Payload as ConfigPayload
 
 logger = logging.getLogger(__name__)
 
 
-class Payload(namedtuple("SessionPayload", ["id", "type", "pomodoros", "duration"])):
+class Payload(Immutable):
+    """
+    Session state sent with the session events, the id is only generated when a receiver asks for it
+    """
+
+    __slots__ = ("type", "pomodoros", "duration", "_id", "_countdown")
+
+    _fields = ("id", "type", "pomodoros", "duration")
+    _typename = "SessionPayload"
+
+    def __init__(self, id=None, type: Type = None, pomodoros: int = 0, duration: int = 0):
+        assign(self, "_id", id)
+        assign(self, "type", type)
+        assign(self, "pomodoros", pomodoros)
+        assign(self, "duration", duration)
+
+    @property
+    def id(self) -> uuid.UUID:
+        if self._id is None:
+            assign(self, "_id", uuid.uuid4())
+        return self._id
+
     @property
     def countdown(self) -> str:
-        return format_seconds(self.duration)
+        try:
+            return self._countdown
+        except AttributeError:
+            assign(self, "_countdown", format_seconds(self.duration))
+            return self._countdown
 
 
 class Type(enum.Enum):
@@ -48,6 +73,8 @@ class State(enum.Enum):
 
 @register.factory("tomate.session", scope=SingletonScope)
 class Session(Subscriber):
+    __slots__ = ("state", "current", "pomodoros", "_durations", "_config", "_timer", "_bus", "__weakref__")
+
     @inject(
         bus="tomate.bus",
         config="tomate.config",
@@ -60,6 +87,8 @@ class Session(Subscriber):
         self.state = State.INITIAL
         self.current = Type.POMODORO
         self.pomodoros = 0
+        # seconds of each session type, read from the config until it changes
+        self._durations = {}
         self.connect(bus)
 
     @fsm(source=[State.INITIAL], target=State.STOPPED, exit=lambda self: self._trigger(Events.SESSION_READY))
@@ -94,11 +123,9 @@ class Session(Subscriber):
         self.pomodoros = 0
         return True
 
-    @on(Events.CONFIG_CHANGE)
+    @on(Events.CONFIG_CHANGE, where={"section": Config.DURATION_SECTION})
     def _on_config_change(self, payload: ConfigPayload) -> bool:
-        if payload.section != "timer":
-            return False
-
+        self._durations.clear()
         return self.change(self.current)
 
     @fsm(source=[State.STOPPED, State.ENDED], target="self", exit=lambda self: self._trigger(Events.SESSION_CHANGE))
@@ -109,8 +136,12 @@ class Session(Subscriber):
 
     @property
     def duration(self) -> int:
-        minutes = self._config.get_int(self._config.DURATION_SECTION, self.current.option)
-        return int(minutes * SECONDS_IN_A_MINUTE)
+        try:
+            return self._durations[self.current]
+        except KeyError:
+            minutes = self._config.get_int(self._config.DURATION_SECTION, self.current.option)
+            seconds = self._durations[self.current] = int(minutes * SECONDS_IN_A_MINUTE)
+            return seconds
 
     def timer_is_up(self) -> bool:
         return not self._timer.is_running()
@@ -123,7 +154,7 @@ class Session(Subscriber):
         exit=lambda self: self._trigger(Events.SESSION_CHANGE),
     )
     def _end(self, payload: TimerPayload) -> bool:
-        payload = self._create_payload(duration=payload.duration)
+        previous, duration = self.current, payload.duration
 
         if self.current == Type.POMODORO:
             self.pomodoros += 1
@@ -131,10 +162,12 @@ class Session(Subscriber):
         else:
             self.current = Type.POMODORO
 
-        logger.debug("action=end previous=%s current=%s", payload.type, self.current)
+        logger.debug("action=end previous=%s current=%s", previous, self.current)
 
         self.state = State.ENDED
-        self._bus.send(Events.SESSION_END, payload=payload._replace(pomodoros=self.pomodoros))
+        self._bus.publish(
+            Events.SESSION_END, payload=Payload(type=previous, pomodoros=self.pomodoros, duration=duration)
+        )
 
         return True
 
@@ -146,14 +179,4 @@ class Session(Subscriber):
         return not self.pomodoros % long_break_interval
 
     def _trigger(self, event: Events) -> None:
-        self._bus.send(event, payload=self._create_payload())
-
-    def _create_payload(self, **kwargs) -> Payload:
-        defaults = {
-            "duration": self.duration,
-            "id": uuid.uuid4(),
-            "pomodoros": self.pomodoros,
-            "type": self.current,
-        }
-        defaults.update(kwargs)
-        return Payload(**defaults)
+        self._bus.publish(event, payload=Payload(type=self.current, pomodoros=self.pomodoros, duration=self.duration))
@@ -1,13 +1,14 @@
 import enum
 import logging
-from collections import namedtuple
+import math
 
-from gi.repository import GLib
 from wiring import SingletonScope, inject
 from wiring.scanning import register
 
-from .event import Bus, Events
+from .event import Bus, Events, Granularity, Subscriber, on
 from .fsm import fsm
+from .payload import Immutable, assign
+from .scheduler import Scheduler
 
 logger = logging.getLogger(__name__)
 SECONDS_IN_A_MINUTE = 60
@@ -18,13 +19,37 @@ def format_seconds(seconds: int) -> str:
     return "{0:0>2}:{1:0>2}".format(minutes, seconds)
 
 
-class Payload(namedtuple("TimerPayload", ["time_left", "duration"])):
+class Payload(Immutable):
+    """
+    Timer state sent with the timer events, the derived values are computed on first use and kept
+    """
+
+    __slots__ = ("time_left", "duration", "skew", "remaining", "_remaining_ratio", "_elapsed_percent", "_countdown")
+
+    _fields = ("time_left", "duration", "skew", "remaining")
+    _typename = "TimerPayload"
+
+    def __init__(self, time_left: int, duration: int, skew: float = 0.0, remaining: float = None):
+        assign(self, "time_left", time_left)
+        assign(self, "duration", duration)
+        assign(self, "skew", skew)
+        assign(self, "remaining", remaining)
+
     @property
     def remaining_ratio(self) -> float:
         try:
-            return self.time_left / self.duration
+            return self._remaining_ratio
+        except AttributeError:
+            pass
+
+        remaining = self.time_left if self.remaining is None else self.remaining
+        try:
+            ratio = remaining / self.duration
         except ZeroDivisionError:
-            return 0.0
+            ratio = 0.0
+
+        assign(self, "_remaining_ratio", ratio)
+        return ratio
 
     @property
     def elapsed_ratio(self) -> float:
@@ -35,12 +60,22 @@ class Payload(namedtuple("TimerPayload", ["time_left", "duration"])):
         """
         Returns the percentage in 5% steps
         """
+        try:
+            return self._elapsed_percent
+        except AttributeError:
+            pass
+
         percent = self.elapsed_ratio * 100
-        return percent - percent % 5
+        assign(self, "_elapsed_percent", percent - percent % 5)
+        return self._elapsed_percent
 
     @property
     def countdown(self) -> str:
-        return format_seconds(self.time_left)
+        try:
+            return self._countdown
+        except AttributeError:
+            assign(self, "_countdown", format_seconds(self.time_left))
+            return self._countdown
 
 
 # Based on Tomatoro create by Pierre Quillery.
@@ -55,25 +90,60 @@ class State(enum.Enum):
 
 
 @register.factory("tomate.timer", scope=SingletonScope)
-class Timer:
+class Timer(Subscriber):
+    __slots__ = (
+        "duration",
+        "time_left",
+        "remaining",
+        "skew",
+        "resolution",
+        "state",
+        "_deadline",
+        "_wakeup",
+        "_boot_offset",
+        "_second",
+        "_background",
+        "_bus",
+        "_scheduler",
+        "_clock",
+        "__weakref__",
+    )
+
     ONE_SECOND = 1
+    SUSPEND_THRESHOLD = 1
+    TICKLESS_MAX_SLEEP = 60
 
-    @inject(bus="tomate.bus")
-    def __init__(self, bus: Bus):
+    @inject(bus="tomate.bus", scheduler="tomate.scheduler")
+    def __init__(self, bus: Bus, scheduler: Scheduler):
         self.duration = self.time_left = 0
+        self.remaining = self.skew = 0.0
+        self.resolution = Timer.ONE_SECOND
         self.state = State.STOPPED
+        self._deadline = self._wakeup = self._boot_offset = 0.0
+        self._second = 0
+        self._background = False
         self._bus = bus
+        self._scheduler = scheduler
+        self._clock = scheduler.clock
+        self.connect(bus)
 
     @fsm(target=State.STARTED, source=[State.ENDED, State.STOPPED], exit=lambda self: self._trigger(Events.TIMER_START))
     def start(self, seconds: int) -> bool:
         logger.debug("action=start")
-        self.duration = self.time_left = seconds
-        GLib.timeout_add_seconds(Timer.ONE_SECOND, self._update, priority=GLib.PRIORITY_HIGH)
+        self.duration = self.time_left = self._second = seconds
+        self.remaining = float(seconds)
+        self.skew = 0.0
+        self._deadline = self._clock.monotonic() + seconds
+        self._boot_offset = self._clock.boottime() - self._clock.monotonic()
+        # a new countdown, receivers with a granularity get its first update even if it looks like the last one
+        self._bus.reset(Events.TIMER_UPDATE)
+        self._schedule()
         return True
 
     @fsm(target=State.STOPPED, source=[State.STARTED], exit=lambda self: self._trigger(Events.TIMER_STOP))
     def stop(self) -> bool:
         logger.debug("action=reset")
+        self._scheduler.cancel(self)
         self._reset()
         return True
 
@@ -88,23 +158,109 @@ class Timer:
     )
     def end(self) -> bool:
         logger.debug("action=end")
+        self._scheduler.cancel(self)
         return True
 
-    def _update(self) -> bool:
-        logger.debug("action=update time_left=%d duration=%d", self.time_left, self.duration)
+    @on(Events.WINDOW_HIDE)
+    def _on_window_hide(self, **__) -> None:
+        # the next tick decides if it is the last one before the deadline
+        self._background = True
+
+    @on(Events.WINDOW_SHOW)
+    def _on_window_show(self, **__) -> None:
+        self._background = False
+
+        if self.is_running():
+            logger.debug("action=resume_ticks")
+            self._wakeup = self._clock.monotonic()
+            self._scheduler.schedule(self, 0, self._update)
+
+    def set_resolution(self, seconds: float) -> None:
+        """
+        Changes the interval between updates, it has to divide a second so the whole seconds are still reached exactly.
+        Only the Granularity.TICK receivers get the updates in between.
+        """
+        if not 0 < seconds <= Timer.ONE_SECOND or not self._divides_a_second(seconds):
+            raise ValueError("Resolution must divide {} second, got {}".format(Timer.ONE_SECOND, seconds))
 
+        logger.debug("action=set_resolution seconds=%.3f", seconds)
+        self.resolution = seconds
+
+        if self.is_running():
+            self._schedule()
+
+    @staticmethod
+    def _divides_a_second(seconds: float) -> bool:
+        steps = Timer.ONE_SECOND / seconds
+        return math.isclose(steps, round(steps))
+
+    def is_tickless(self) -> bool:
+        return self._background and not self._bus.has_receivers(Events.TIMER_UPDATE)
+
+    def _schedule(self) -> None:
+        now = self._clock.monotonic()
+
+        if self.is_tickless():
+            # nobody is watching the countdown, sleeps until the deadline but wakes up once in a while,
+            # the monotonic clock stops during a suspend and only a wake up notices it
+            delay = min(max(self._remaining(now), 0), Timer.TICKLESS_MAX_SLEEP)
+        else:
+            # wakes up exactly when the countdown crosses the next step of the resolution, so a late tick does not
+            # push the following ones. Counts whole steps, a float modulo of the remaining time is never exactly 0.
+            remaining = self._remaining(now)
+            step = math.ceil(round(remaining / self.resolution, 6)) - 1
+            delay = remaining - step * self.resolution
+
+        self._wakeup = now + delay
+        self._scheduler.schedule(self, delay, self._update)
+
+    def _suspended_for(self) -> float:
+        # the monotonic clock stops during a suspend, the boot clock keeps counting
+        boot_offset = self._clock.boottime() - self._clock.monotonic()
+        suspended = boot_offset - self._boot_offset
+        self._boot_offset = boot_offset
+        return suspended if suspended >= Timer.SUSPEND_THRESHOLD else 0.0
+
+    def _remaining(self, now: float) -> float:
+        # millisecond precision, the resolution of the main loop timeouts, hides float noise
+        return round(self._deadline - now, 3)
+
+    def _update(self) -> None:
         if self.state != State.STARTED:
-            return False
+            return
 
-        if self._is_up():
-            return self.end()
+        now = self._clock.monotonic()
+        suspended = self._suspended_for()
+        self._deadline -= suspended
+        self.remaining = max(0.0, self._remaining(now))
+        self.time_left = math.ceil(self.remaining)
 
-        self.time_left -= 1
-        self._trigger(Events.TIMER_UPDATE)
-        return True
+        if suspended and self._is_up():
+            logger.debug("action=settle suspended=%.3f", suspended)
+            self.skew = now - self._deadline
+            self.end()
+            return
+
+        self.skew = now - self._wakeup
+
+        logger.debug("action=update remaining=%.3f duration=%d skew=%.3f", self.remaining, self.duration, self.skew)
+
+        if self.time_left != self._second:
+            self._second = self.time_left
+            self._trigger(Events.TIMER_UPDATE)
+        else:
+            # still the same second, only the receivers that want every tick care
+            self._trigger(Events.TIMER_UPDATE, granularity=Granularity.TICK)
+
+        if self._is_up():
+            self.end()
+        else:
+            self._schedule()
 
     def _reset(self) -> None:
         self.duration = self.time_left = 0
+        self.remaining = self.skew = 0.0
 
-    def _trigger(self, event) -> None:
-        self._bus.send(event, payload=Payload(time_left=self.time_left, duration=self.duration))
+    def _trigger(self, event, granularity: Granularity = None) -> None:
+        payload = Payload(time_left=self.time_left, duration=self.duration, skew=self.skew, remaining=self.remaining)
+        self._bus.publish(event, payload=payload, granularity=granularity)
@@ -3,7 +3,7 @@ from collections import deque
 from functools import reduce
 from typing import Any, Callable, List, Optional
 
-from gi.repository import GLib, Gtk
+from gi.repository import Gtk
 
 from tomate.pomodoro import SessionPayload, SessionType
 from tomate.ui import Shortcut, ShortcutEngine
@@ -29,11 +29,6 @@ def create_session_payload(**kwargs) -> SessionPayload:
     return SessionPayload(**defaults)
 
 
-def run_loop_for(seconds: int = 1) -> None:
-    GLib.timeout_add_seconds(seconds, Gtk.main_quit)
-    Gtk.main()
-
-
 def refresh_gui(delay: int = 0) -> None:
     while Gtk.events_pending():
         Gtk.main_iteration_do(False)
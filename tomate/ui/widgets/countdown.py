@@ -14,6 +14,7 @@ logger = logging.getLogger(__name__)
 class Countdown(Subscriber):
     @inject(bus="tomate.bus")
     def __init__(self, bus: Bus):
+        self._bus = bus
         self.widget = Gtk.Label(margin_top=30, margin_bottom=10, margin_right=10, margin_left=10, label="00:00")
         self.connect(bus)
 
@@ -22,6 +23,16 @@ class Countdown(Subscriber):
         logger.debug("action=update countdown=%s", payload.countdown)
         self.widget.set_markup(self.timer_markup(payload.countdown))
 
+    @on(Events.WINDOW_HIDE)
+    def _on_window_hide(self, **__) -> None:
+        logger.debug("action=pause_updates")
+        self._bus.disconnect(Events.TIMER_UPDATE, self._update_countdown)
+
+    @on(Events.WINDOW_SHOW)
+    def _on_window_show(self, **__) -> None:
+        logger.debug("action=resume_updates")
+        self._bus.connect(Events.TIMER_UPDATE, self._update_countdown)
+
     @staticmethod
     def timer_markup(time_left: str) -> str:
         return '<span face="sans-serif" font="45">{}</span>'.format(time_left)